@@ -0,0 +1,150 @@
+"""Timings of the stages of ``plot``, for synthetic data of growing size.
+
+The classes follow the conventions of `asv <https://asv.readthedocs.io>`_
+(``params``, ``setup`` and ``time_*`` methods) and can also be run with
+``python -m benchmarks.run``.
+"""
+import tempfile
+from io import StringIO
+from pathlib import Path
+from Bio import Phylo
+from lingtreemaps import background
+from lingtreemaps.clades import CladeIndex
+from lingtreemaps.clades import sort_tree
+from lingtreemaps.colors import FeatureColors
+from lingtreemaps.helpers import close_figure
+from lingtreemaps.helpers import new_figure
+from lingtreemaps.layout import compute_layout
+from lingtreemaps.layout import located_points
+from lingtreemaps.plotting import draw_feature
+from lingtreemaps.plotting import draw_layout
+from lingtreemaps.plotting import get_conf
+from lingtreemaps.plotting import save_figure
+from lingtreemaps.trees import read_newick
+from benchmarks import synthetic
+
+
+SIZES = [100, 1000, 10000, 50000]
+
+
+class Data:
+    """Synthetic data and the results of the stages before the timed one"""
+
+    params = (SIZES, synthetic.SHAPES)
+    param_names = ["leaves", "shape"]
+    timeout = 1800
+
+    def setup(self, leaves, shape):
+        self.conf = get_conf()
+        self.newick = synthetic.newick(leaves, shape)
+        self.lg_df = synthetic.languages(leaves)
+        self.feature_df = synthetic.feature(leaves)
+        self.tree = self.read_tree()
+        self.array_tree = read_newick(StringIO(self.newick))
+        self.colors = FeatureColors(self.lg_df, self.feature_df)
+        self.located = located_points(self.colors.languages)
+        self.layout = compute_layout(self.located, self.tree)
+        self.points = self.layout.rotate(self.located)
+
+    def read_tree(self):
+        return Phylo.read(StringIO(self.newick), "newick")
+
+    def background_layers(self):
+        level = background.choose_level(self.layout.visible_map)
+        # not background.visible_layer, which caches the clipped layers
+        return [
+            background.rotated_layer(
+                name,
+                self.layout.outer_bounds,
+                level,
+                self.layout.rotation,
+                self.layout.center,
+            )
+            for name in ["countries", "rivers"]
+        ]
+
+    def draw(self):
+        """Draws the layout and the feature on a new figure"""
+        conf = self.conf
+        fig, ax = new_figure()
+        edge_colors = self.colors.edge_colors(
+            self.layout.node_names, self.layout.root, conf["color_tree"]
+        )
+        draw_layout(
+            ax,
+            self.layout,
+            self.points,
+            [edge_colors[i] for i in self.layout.segment_owners],
+            self.points["color"].to_numpy()[self.layout.connector_rows],
+            None,
+            label_column=conf["label_column"],
+            print_labels=conf["print_labels"],
+            tree_lw=1,
+            connection_lw=conf["connection_lw"],
+            font_size=conf["font_size"],
+            text_x_offset=conf["text_x_offset"],
+            text_y_offset=conf["text_y_offset"],
+            background=conf["background"],
+            cx_provider=None,
+            debug=False,
+        )
+        draw_feature(
+            ax,
+            self.layout,
+            self.colors,
+            self.points,
+            id_col=conf["id_col"],
+            legend_position=conf["legend_position"],
+            legend_size=conf["legend_size"],
+            leaf_marker_size=conf["leaf_marker_size"],
+            leaf_lw=conf["leaf_lw"],
+            map_marker_size=conf["map_marker_size"],
+            map_marker_lw=conf["map_marker_lw"],
+            nonterminal_nodes=conf["nonterminal_nodes"],
+        )
+        return fig
+
+
+class Stages(Data):
+    def time_read_tree(self, leaves, shape):
+        self.read_tree()
+
+    def time_read_newick(self, leaves, shape):
+        read_newick(StringIO(self.newick))
+
+    def time_merge(self, leaves, shape):
+        FeatureColors(self.lg_df, self.feature_df)
+
+    def time_sort(self, leaves, shape):
+        leaf_y = self.located.groupby("ID")["Latitude"]
+        index = CladeIndex(self.tree, leaf_y.min().to_dict(), leaf_y.max().to_dict())
+        sort_tree(self.tree, index, "min")
+
+    def time_layout(self, leaves, shape):
+        compute_layout(self.located, self.tree)
+
+    def time_layout_array_tree(self, leaves, shape):
+        compute_layout(self.located, self.array_tree)
+
+    def time_background(self, leaves, shape):
+        self.background_layers()
+
+    def time_draw(self, leaves, shape):
+        close_figure(self.draw())
+
+
+class Save(Data):
+    params = Data.params + (["pdf", "svg", "png"],)
+    param_names = Data.param_names + ["file_format"]
+
+    def setup(self, leaves, shape, file_format):  # pylint: disable=arguments-differ
+        super().setup(leaves, shape)
+        self.fig = self.draw()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def teardown(self, leaves, shape, file_format):
+        close_figure(self.fig)
+        self.directory.cleanup()
+
+    def time_save(self, leaves, shape, file_format):
+        save_figure(self.fig, Path(self.directory.name) / "map", file_format)
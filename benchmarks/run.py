@@ -0,0 +1,145 @@
+"""Runs the benchmarks without asv, stores and compares their results.
+
+``python -m benchmarks.run`` writes the best time of every benchmark to
+``benchmarks/results/<version>-<commit>.json``; ``--compare`` lists the
+benchmarks which got slower than in an earlier results file (and exits with
+status 1 if there are any).
+"""
+import argparse
+import inspect
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+import lingtreemaps
+from benchmarks import benchmarks
+
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def benchmark_classes():
+    return [
+        cls
+        for _, cls in inspect.getmembers(benchmarks, inspect.isclass)
+        if cls.__module__ == benchmarks.__name__
+        and any(name.startswith("time_") for name in vars(cls))
+    ]
+
+
+def param_key(cls, params):
+    return ",".join(f"{name}={value}" for name, value in zip(cls.param_names, params))
+
+
+def run(select=None, sizes=None, shapes=None, repeat=3):
+    """Times every benchmark (matching ``select``) for every combination of
+    parameters; returns ``{benchmark: {parameters: seconds}}``. Failing
+    benchmarks get ``None``."""
+    results = {}
+    for cls in benchmark_classes():
+        names = sorted(x for x in vars(cls) if x.startswith("time_"))
+        names = [x for x in names if not select or select in f"{cls.__name__}.{x}"]
+        grid = list(cls.params)
+        grid[0] = [x for x in grid[0] if not sizes or x in sizes]
+        grid[1] = [x for x in grid[1] if not shapes or x in shapes]
+        for params in itertools.product(*grid):
+            if not names:
+                break
+            key = param_key(cls, params)
+            instance = cls()
+            try:
+                instance.setup(*params)
+            except Exception:  # pylint: disable=broad-except
+                print(f"{cls.__name__} ({key}): setup failed", file=sys.stderr)
+                print(traceback.format_exc(limit=3), file=sys.stderr)
+                for name in names:
+                    results.setdefault(f"{cls.__name__}.{name}", {})[key] = None
+                continue
+            for name in names:
+                timings = []
+                try:
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        getattr(instance, name)(*params)
+                        timings.append(time.perf_counter() - start)
+                except Exception:  # pylint: disable=broad-except
+                    print(traceback.format_exc(limit=3), file=sys.stderr)
+                best = min(timings) if len(timings) == repeat else None
+                results.setdefault(f"{cls.__name__}.{name}", {})[key] = best
+                print(f"{cls.__name__}.{name} ({key}): {best}")
+            if hasattr(instance, "teardown"):
+                instance.teardown(*params)
+    return results
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(results, directory=RESULTS_DIR):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "version": lingtreemaps.__version__,
+        "commit": commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.node(),
+    }
+    path = directory / f"{meta['version']}-{meta['commit']}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    return path
+
+
+def compare(old, new, threshold=1.25):
+    """Benchmarks that take more than ``threshold`` times as long in ``new``
+    (or fail only there), as ``(benchmark, parameters, old, new)``"""
+    regressions = []
+    for name, timings in new.items():
+        for key, seconds in timings.items():
+            before = old.get(name, {}).get(key)
+            if before is None:
+                continue
+            if seconds is None or seconds > before * threshold:
+                regressions.append((name, key, before, seconds))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", maxsplit=1)[0])
+    parser.add_argument("-k", "--select", help="Only run benchmarks containing this")
+    parser.add_argument("--sizes", nargs="+", type=int, help="Numbers of leaves")
+    parser.add_argument("--shapes", nargs="+", help="Tree shapes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="An earlier results file")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(args)
+    results = run(args.select, args.sizes, args.shapes, args.repeat)
+    print(f"Saved {save(results, args.output)}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)["results"]
+        regressions = compare(old, results, args.threshold)
+        for name, key, before, after in regressions:
+            print(f"Slower: {name} ({key}): {before:.4f} s -> {after} s")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""Synthetic trees, language tables and features of any size.
+
+Run ``python -m benchmarks.synthetic LEAVES SHAPE DIRECTORY`` to write a
+dataset (``<shape>_<leaves>.newick``, ``.csv`` and ``_feature.csv``).
+"""
+import sys
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+
+SHAPES = ["balanced", "caterpillar"]
+# languages are scattered over this box (lon, lat), in northern South America
+BOX = (-75, -20, -40, 10)
+
+
+def balanced_newick(leaves):
+    """A tree with leaves ``L0``, ``L1``... paired up level by level"""
+    nodes = [f"L{i}" for i in range(leaves)]
+    count = 0
+    while len(nodes) > 1:
+        pairs = []
+        for i in range(0, len(nodes) - 1, 2):
+            pairs.append(f"({nodes[i]},{nodes[i + 1]})N{count}")
+            count += 1
+        if len(nodes) % 2:
+            pairs.append(nodes[-1])
+        nodes = pairs
+    return nodes[0] + ";"
+
+
+def caterpillar_newick(leaves):
+    """A tree in which every node has a leaf and another node as children:
+    ``(((L0,L1)N1,L2)N2,L3)N3;``"""
+    inner = "".join(f",L{i})N{i}" for i in range(1, leaves))
+    return "(" * (leaves - 1) + "L0" + inner + ";"
+
+
+def newick(leaves, shape="balanced"):
+    if shape == "balanced":
+        return balanced_newick(leaves)
+    if shape == "caterpillar":
+        return caterpillar_newick(leaves)
+    raise ValueError(f"Unknown tree shape: {shape}")
+
+
+def languages(leaves, seed=0):
+    """A language table for the leaves of :func:`newick`, with random
+    coordinates"""
+    rng = np.random.default_rng(seed)
+    ids = [f"L{i}" for i in range(leaves)]
+    return pd.DataFrame(
+        {
+            "ID": ids,
+            "Name": ids,
+            "Latitude": rng.uniform(BOX[1], BOX[3], leaves).round(4),
+            "Longitude": rng.uniform(BOX[0], BOX[2], leaves).round(4),
+        }
+    )
+
+
+def feature(leaves, values=5, seed=0):
+    """A feature table with ``values`` random values"""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Clade": [f"L{i}" for i in range(leaves)],
+            "Value": [f"value {x}" for x in rng.integers(values, size=leaves)],
+        }
+    )
+
+
+def write_dataset(directory, leaves, shape="balanced"):
+    """Writes a tree, a language table and a feature table to ``directory``,
+    returns their paths"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = directory / f"{shape}_{leaves}"
+    paths = (
+        stem.with_suffix(".newick"),
+        stem.with_suffix(".csv"),
+        stem.with_name(f"{stem.name}_feature.csv"),
+    )
+    paths[0].write_text(newick(leaves, shape), encoding="utf-8")
+    languages(leaves).to_csv(paths[1], index=False)
+    feature(leaves).to_csv(paths[2], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    for path in write_dataset(sys.argv[3], int(sys.argv[1]), sys.argv[2]):
+        print(path)
@@ -0,0 +1,183 @@
+"""Background layers (countries and rivers) shipped with lingtreemaps."""
+import logging
+from pathlib import Path
+import geopandas as gpd
+import numpy as np
+import shapely
+import shapely.geometry
+from lingtreemaps.helpers import LRUCache
+from lingtreemaps.helpers import cache_dir
+from lingtreemaps.helpers import data_path
+from lingtreemaps.helpers import rotate_geometries
+
+
+log = logging.getLogger(__name__)
+
+LAYER_FILES = {
+    "countries": "world-administrative-boundaries.shp",
+    "rivers": "MajorRivers.shp",
+}
+
+# simplification tolerances (in degrees) of the levels of detail; level 0 are
+# the original shapefiles
+LEVELS = [0, 0.01, 0.05, 0.2]
+
+
+class LayerCache(LRUCache):
+    """A process-wide LRU cache of loaded background layers.
+
+    Keeps at most ``maxsize`` GeoDataFrames; the least recently used ones are
+    evicted first. Cached layers are shared between plots and must not be
+    modified in place.
+    """
+
+
+layer_cache = LayerCache()
+# the visible parts of layers in recent maps, reused while their bounds and
+# rotation stay the same
+visible_cache = LayerCache(maxsize=4)
+
+
+def set_cache_size(maxsize):
+    """How many background layers should be kept in memory? 0 disables caching."""
+    layer_cache.resize(maxsize)
+
+
+def default_build_dir():
+    """Where ``build_compact_layers`` writes by default; layers found there
+    are preferred to the ones shipped with the package"""
+    return cache_dir("backgrounds")
+
+
+def compact_path(name, level, directory=None):
+    return Path(directory or data_path) / f"{name}.{level}.npz"
+
+
+def build_compact_layers(directory=None, levels=None):
+    """Converts the background shapefiles to a compact format.
+
+    For every layer and simplified level of detail, the geometries are
+    simplified with the level's tolerance and stored as flat coordinate and
+    offset arrays (see ``shapely.to_ragged_array``) in an uncompressed
+    ``.npz`` file in ``directory`` (default: :func:`default_build_dir`).
+    Returns the paths of the written files.
+    """
+    levels = levels or LEVELS
+    directory = Path(directory or default_build_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, filename in LAYER_FILES.items():
+        geometries = np.asarray(gpd.read_file(data_path / filename).geometry.array)
+        for level, tolerance in enumerate(levels[1:], start=1):
+            simplified = shapely.simplify(geometries, tolerance, preserve_topology=True)
+            geometry_type, coords, offsets = shapely.to_ragged_array(simplified)
+            path = compact_path(name, level, directory)
+            np.savez(
+                path,
+                geometry_type=int(geometry_type),
+                tolerance=tolerance,
+                coords=coords.astype(np.float32),
+                **{f"offsets{i}": x for i, x in enumerate(offsets)},
+            )
+            log.info(f"Wrote {path} ({len(coords)} coordinates)")
+            paths.append(path)
+    return paths
+
+
+def read_compact_layer(path):
+    with np.load(path) as data:
+        offsets = []
+        while f"offsets{len(offsets)}" in data:
+            offsets.append(data[f"offsets{len(offsets)}"])
+        geometries = shapely.from_ragged_array(
+            shapely.GeometryType(int(data["geometry_type"])),
+            data["coords"],
+            tuple(offsets),
+        )
+    return gpd.GeoDataFrame(geometry=geometries, crs="EPSG:4326")
+
+
+def choose_level(bounds, resolution=1000):
+    """The coarsest level of detail suitable for a map of the given bounds.
+
+    Simplification stays below 1/``resolution`` of the larger side of the map.
+    """
+    extent = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+    level = 0
+    for i, tolerance in enumerate(LEVELS):
+        if tolerance <= extent / resolution:
+            level = i
+    return level
+
+
+def read_layer(name, level=0):
+    """Reads a background layer from disk, preferring the compact format"""
+    if level:
+        for directory in [default_build_dir(), data_path]:
+            path = compact_path(name, level, directory)
+            if path.is_file():
+                return read_compact_layer(path)
+        log.debug(f"{path} not found, reading {LAYER_FILES[name]}")
+    return gpd.read_file(data_path / LAYER_FILES[name])
+
+
+def load_layer(name, level=0):
+    """Returns the background layer ``name`` ("countries" or "rivers").
+
+    ``level`` is the level of detail, from 0 (full resolution) to
+    ``len(LEVELS) - 1``. Layers are only read from disk when first requested
+    and are cached per name and level.
+    """
+    return layer_cache.get((name, level), lambda: read_layer(name, level))
+
+
+def clip_layer(layer, bounds, margin=0.05):
+    """Returns the parts of a layer within ``bounds`` (xmin, ymin, xmax, ymax).
+
+    Candidate geometries are found with the spatial index of the layer, then
+    clipped to the bounds, enlarged by ``margin`` (relative to their size) so
+    that the new outlines are not visible.
+    """
+    pad_x = (bounds[2] - bounds[0]) * margin
+    pad_y = (bounds[3] - bounds[1]) * margin
+    box = shapely.geometry.box(
+        bounds[0] - pad_x, bounds[1] - pad_y, bounds[2] + pad_x, bounds[3] + pad_y
+    )
+    visible = layer.iloc[layer.sindex.query(box, predicate="intersects")]
+    return visible.clip(box, keep_geom_type=True)
+
+
+def visible_layer(name, bounds, level=0, rotation=0, origin=(0, 0)):
+    """The part of a background layer within ``bounds`` of a map rotated by
+    ``rotation`` degrees around ``origin`` (x, y).
+
+    The layer is clipped before it is rotated, so only visible geometries
+    are transformed. The result is cached and must not be modified in place.
+    """
+    key = (
+        name,
+        level,
+        tuple(float(x) for x in bounds),
+        float(rotation),
+        tuple(float(x) for x in origin),
+    )
+    return visible_cache.get(
+        key, lambda: rotated_layer(name, bounds, level, rotation, origin)
+    )
+
+
+def rotated_layer(name, bounds, level=0, rotation=0, origin=(0, 0)):
+    """Computes :func:`visible_layer`"""
+    layer = load_layer(name, level)
+    if rotation:
+        # the bounds, as seen from the unrotated layer
+        bounds = rotate_geometries(
+            shapely.geometry.box(*bounds), -rotation, origin
+        ).bounds
+    layer = clip_layer(layer, bounds)
+    if rotation:
+        layer = gpd.GeoDataFrame(
+            geometry=rotate_geometries(layer.geometry.values, rotation, origin),
+            crs=layer.crs,
+        )
+    return layer
@@ -0,0 +1,120 @@
+"""Rendering many maps in parallel."""
+import logging
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import yaml
+import lingtreemaps
+from lingtreemaps import background
+from lingtreemaps.helpers import close_figure
+from lingtreemaps.helpers import read_data_file
+from lingtreemaps.trees import read_newick
+
+
+log = logging.getLogger(__name__)
+
+JOB_FILES = ["languages", "tree", "feature", "text", "conf"]
+
+
+def load_manifest(path):
+    """Reads a YAML list of jobs.
+
+    Every job has the keys ``languages`` and ``tree`` and optionally
+    ``feature``, ``text`` (a text label table), ``conf`` (a configuration file
+    or a mapping) and ``output`` (the name of the map). Relative paths are
+    resolved against the directory of the manifest.
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        jobs = yaml.load(f, yaml.SafeLoader) or []
+    if not isinstance(jobs, list):
+        raise ValueError(f"{path} must contain a list of jobs")
+    for job in jobs:
+        for key in JOB_FILES:
+            if isinstance(job.get(key), str):
+                job[key] = (path.parent / job[key]).as_posix()
+    return jobs
+
+
+def warm_up(levels=None):
+    """Loads the background layers, so that every job of a worker finds them
+    in the layer cache"""
+    for name in background.LAYER_FILES:
+        for level in levels or range(len(background.LEVELS)):
+            background.load_layer(name, level)
+
+
+def render(job, output_dir=".", render_cache=None):
+    """Renders a single job (see :func:`load_manifest`), returns the name of
+    the created map. ``render_cache`` overrides the one configured for the
+    job."""
+    for key in ["languages", "tree"]:
+        if not job.get(key):
+            raise ValueError(f"Job without {key}: {job}")
+    df = read_data_file(job["languages"])
+    tree = read_newick(job["tree"])
+    feature_df = read_data_file(job["feature"]) if job.get("feature") else None
+    kwargs = dict(file_format="pdf")
+    conf = job.get("conf")
+    if isinstance(conf, str):
+        conf = lingtreemaps.load_conf(conf)
+    kwargs.update(conf or {})
+    if render_cache:
+        kwargs["render_cache"] = render_cache
+    filename = job.get("output") or kwargs.get("filename")
+    kwargs["filename"] = (
+        Path(output_dir) / (filename or Path(job["languages"]).stem)
+    ).as_posix()
+    ax = lingtreemaps.plot(df, tree, feature_df, text_df=job.get("text"), **kwargs)
+    if ax is not None:  # not copied from the render cache
+        close_figure(ax.figure)
+    return kwargs["filename"]
+
+
+def run_job(job, output_dir=".", render_cache=None):
+    """Runs :func:`render`, returning errors instead of raising them"""
+    try:
+        output = render(job, output_dir, render_cache)
+        return {"job": job, "output": output, "error": None}
+    except Exception:  # pylint: disable=broad-except
+        return {"job": job, "output": None, "error": traceback.format_exc()}
+
+
+def run_batch(jobs, processes=None, output_dir=".", preload=True, render_cache=None):
+    """Renders ``jobs`` (a list of job mappings or the path of a manifest)
+    in a pool of ``processes`` worker processes (default: one per CPU; 0 runs
+    the jobs in this process).
+
+    Every worker loads the background layers before its first job unless
+    ``preload`` is false. Maps which are in the ``render_cache`` (a
+    directory, or ``True`` for the default one) are copied from there. A
+    failing job does not affect the others; returns a list with the
+    ``output`` or the ``error`` of every job.
+    """
+    if isinstance(jobs, (str, Path)):
+        jobs = load_manifest(jobs)
+    if processes == 0:
+        results = [run_job(job, output_dir, render_cache) for job in jobs]
+    else:
+        processes = min(processes or os.cpu_count() or 1, max(len(jobs), 1))
+        with ProcessPoolExecutor(
+            max_workers=processes, initializer=warm_up if preload else None
+        ) as pool:
+            futures = [
+                pool.submit(run_job, job, output_dir, render_cache) for job in jobs
+            ]
+            results = []
+            for job, future in zip(jobs, futures):
+                try:
+                    results.append(future.result())
+                except Exception:  # pylint: disable=broad-except
+                    # the worker died
+                    results.append(
+                        {"job": job, "output": None, "error": traceback.format_exc()}
+                    )
+    for i, result in enumerate(results):
+        if result["error"]:
+            log.error(f"Job {i} ({result['job'].get('languages')}) failed:")
+            log.error(result["error"])
+    return results
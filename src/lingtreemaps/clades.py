@@ -0,0 +1,154 @@
+"""Per-clade statistics used for sorting and laying out trees."""
+import numpy as np
+from lingtreemaps.trees import ArrayTree
+from lingtreemaps.trees import phylo_preorder
+
+
+class CladeIndex:
+    """Statistics for every clade of a tree, built in one post-order traversal.
+
+    ``tree`` is an :class:`~lingtreemaps.trees.ArrayTree` or a ``Bio.Phylo``
+    tree, which is converted to one (``self.tree``). Clades are numbered in
+    post-order: ``clades`` lists them (``Bio.Phylo`` clades or node numbers),
+    ``nodes`` their node numbers and ``index[clade]`` gives the position of a
+    clade in the arrays ``parent``, ``y_min``, ``y_max`` (smallest/largest "y"
+    value of the map points of its leaves), ``leaf_count`` and ``leaf_span``
+    (vertical extent covered by these points). Clades without any located
+    leaves get ``nan`` values.
+    """
+
+    def __init__(self, tree, leaf_y_min, leaf_y_max):
+        if isinstance(tree, ArrayTree):
+            self.tree = tree
+            preorder = None
+        else:
+            preorder = phylo_preorder(tree.root)
+            self.tree = ArrayTree.from_clades(preorder, tree.rooted)
+        self.nodes = self.tree.postorder()
+        nodes = self.nodes.tolist()
+        self.clades = [preorder[x] for x in nodes] if preorder else nodes
+        self.index = {clade: i for i, clade in enumerate(self.clades)}
+        size = len(nodes)
+        self.position = np.full(len(self.tree), -1)
+        self.position[self.nodes] = np.arange(size)
+        parent_nodes = self.tree.parent[self.nodes]
+        self.parent = np.where(parent_nodes >= 0, self.position[parent_nodes], -1)
+        self.leaf = self.tree.first_child[self.nodes] < 0
+
+        names = self.tree.node_names
+        y_min = [np.nan] * size
+        y_max = [np.nan] * size
+        leaf_count = [0] * size
+        for i, (node, parent, leaf) in enumerate(
+            zip(nodes, self.parent.tolist(), self.leaf.tolist())
+        ):
+            if leaf:
+                y_min[i] = leaf_y_min.get(names[node], np.nan)
+                y_max[i] = leaf_y_max.get(names[node], np.nan)
+                leaf_count[i] = 1
+            if parent >= 0:
+                # children come before their parents
+                y_min[parent] = np.fmin(y_min[parent], y_min[i])
+                y_max[parent] = np.fmax(y_max[parent], y_max[i])
+                leaf_count[parent] += leaf_count[i]
+        self.y_min = np.array(y_min, dtype=float)
+        self.y_max = np.array(y_max, dtype=float)
+        self.leaf_count = np.array(leaf_count, dtype=int)
+        self.leaf_span = self.y_max - self.y_min
+
+    def clade(self, node):
+        """The clade of a node number"""
+        return self.clades[self.position[node]]
+
+    def depths(self):
+        """How deep does every clade go?
+
+        Equivalent to ``max(clade.depths().values())`` for each clade, falling
+        back to unit branch lengths for clades where all lengths are zero.
+        """
+        base = np.nan_to_num(self.tree.branch_length[self.nodes], nan=0.0)
+        height = [0.0] * len(self.nodes)
+        unit_height = [0] * len(self.nodes)
+        for i, (parent, length) in enumerate(zip(self.parent.tolist(), base.tolist())):
+            if parent >= 0:
+                height[parent] = max(height[parent], length + height[i])
+                unit_height[parent] = max(unit_height[parent], 1 + unit_height[i])
+        depths = base + height
+        return np.where(depths == 0, base + unit_height, depths)
+
+    def middles(self, leaf_positions):
+        """Vertical midpoint between the outermost leaves of every clade
+        (``leaf_positions`` are by clade)"""
+        size = len(self.nodes)
+        low = [np.inf] * size
+        high = [-np.inf] * size
+        parents = self.parent.tolist()
+        for i, (parent, leaf) in enumerate(zip(parents, self.leaf.tolist())):
+            if leaf:
+                low[i] = high[i] = leaf_positions[self.clades[i]]
+            if parent >= 0:
+                low[parent] = min(low[parent], low[i])
+                high[parent] = max(high[parent], high[i])
+        return (np.array(high) + np.array(low)) / 2
+
+    def segments(self, x, y):
+        """Tree lines as an array of segments, in drawing order.
+
+        For every clade (in preorder), the horizontal line leading to it is
+        followed by the vertical line spanning its children. Also returns the
+        index of the clade each segment belongs to.
+        """
+        first_child = self.tree.first_child.tolist()
+        next_sibling = self.tree.next_sibling.tolist()
+        position = self.position.tolist()
+        parents = self.parent.tolist()
+        segments = []
+        owners = []
+        for node in self.tree.preorder().tolist():
+            i = position[node]
+            if parents[i] >= 0:
+                segments.append(((x[parents[i]], y[i]), (x[i], y[i])))
+                owners.append(i)
+            child = first_child[node]
+            if child >= 0:
+                first = position[child]
+                while next_sibling[child] >= 0:
+                    child = next_sibling[child]
+                last = position[child]
+                segments.append(((x[i], y[first]), (x[i], y[last])))
+                owners.append(i)
+        return np.array(segments, dtype=float).reshape(-1, 2, 2), np.array(
+            owners, dtype=int
+        )
+
+    def extreme(self, clade, tree_sort_mode):
+        """Returns the smallest/largest "y" value of any leaf in the clade"""
+        if tree_sort_mode == "min":
+            return self.y_min[self.index[clade]]
+        if tree_sort_mode == "max":
+            return self.y_max[self.index[clade]]
+        raise ValueError("Specify min or max.")
+
+
+def sort_tree(tree, clade_index, tree_sort_mode):
+    """Sorts the children of every clade according to their "y" value.
+
+    Sorts ``clade_index.tree`` and, if ``tree`` is a ``Bio.Phylo`` tree, the
+    clades of ``tree``, too.
+    """
+    if tree_sort_mode not in ["min", "max"]:
+        raise ValueError("Specify min or max.")
+    extremes = clade_index.y_min if tree_sort_mode == "min" else clade_index.y_max
+    array_tree = clade_index.tree
+    position = clade_index.position
+    for i, node in enumerate(clade_index.nodes.tolist()):
+        if clade_index.leaf_count[i] > 1:
+            children = sorted(
+                array_tree.children(node), key=lambda x: extremes[position[x]]
+            )
+            array_tree.set_children(node, children)
+            if tree is not array_tree:
+                clade_index.clades[i].clades = [
+                    clade_index.clade(x) for x in children
+                ]
+    return tree
@@ -3,11 +3,12 @@ import logging
 import sys
 from pathlib import Path
 import click
-from Bio import Phylo
 import lingtreemaps
-from lingtreemaps.helpers import read_data_file
 
 
+# the dependencies of a command are only imported when it runs
+# pylint: disable=import-outside-toplevel
+
 log = logging.getLogger(__name__)
 
 
@@ -22,8 +23,10 @@ def main():
 @click.option(
     "-f",
     "--feature",
-    default=None,
-    help="Path to a CSV with columns ``Clade`` and ``Value``.",
+    multiple=True,
+    help="Path to a CSV with columns ``Clade`` and ``Value``. Can be repeated to "
+    "plot several features on the same tree and map, saved as "
+    "``<output>_<feature file name>``.",
 )
 @click.option("-c", "--conf", default=None, help="Path to a YAML configuration file.")
 @click.option(
@@ -36,34 +39,90 @@ def main():
     default=False,
     help="Show calculated values and orientation lines on the map.",
 )
+@click.option(
+    "--profile",
+    "profile_path",
+    default=None,
+    help="Save the time, added artists and peak memory of every stage to this "
+    "JSON file.",
+)
+@click.option(
+    "--render-cache",
+    default=None,
+    help="Copy unchanged maps from this directory instead of plotting them "
+    "(see ``render_cache``).",
+)
+@click.option(
+    "-w",
+    "--watch",
+    is_flag=True,
+    default=False,
+    help="Keep running and plot the map again whenever one of the files changes, "
+    "only recomputing the colors and the layout if they are affected.",
+)
 def plot(
-    languages, tree, feature, conf, filename, debug
-):  # pylint: disable=too-many-arguments
+    languages, tree, feature, conf, filename, debug, profile_path, render_cache, watch
+):  # pylint: disable=too-many-arguments,too-many-locals
     """LANGUAGES: A CSV file with languages.
     Minimally required columns: ``ID``, ``Latitude``, ``Longitude``.
 
     TREE: A newick tree file."""
-    df = read_data_file(languages)
+    from lingtreemaps.helpers import read_data_file
+    from lingtreemaps.profiling import NO_PROFILE
+    from lingtreemaps.profiling import Profile
+    from lingtreemaps.trees import read_newick
+
+    profile = Profile() if profile_path else NO_PROFILE
+    if watch:
+        from lingtreemaps.watch import watch_files
+
+        try:
+            watch_files(
+                languages,
+                tree,
+                feature,
+                conf,
+                filename=filename or Path(languages).stem,
+                file_format="pdf",
+                debug=debug,
+                profile=profile,
+            )
+        except KeyboardInterrupt:
+            log.info("Stopped watching.")
+        if profile_path:
+            profile.save(profile_path)
+        return
+    with profile.stage("read"):
+        df = read_data_file(languages)
+        tree = read_newick(tree)
+        if len(feature) > 1:
+            features = {Path(x).stem: read_data_file(x) for x in feature}
+        elif feature:
+            feature_df = read_data_file(feature[0])
     if debug:
         print(df)
     if not filename:
         filename = Path(languages).stem
-    tree = Phylo.read(tree, "newick")
-    kwargs = dict(filename=filename, file_format="pdf", debug=debug)
+    kwargs = dict(filename=filename, file_format="pdf", debug=debug, profile=profile)
     if conf:
         kwargs.update(**lingtreemaps.load_conf(conf))
     else:
         log.info("Provide a conf file to style your map.")
-    if feature:
-        feature = Path(feature)
-        feature_df = read_data_file(feature)
+    if render_cache:
+        kwargs["render_cache"] = render_cache
+    if len(feature) > 1:
+        lingtreemaps.plot_features(df, tree, features, **kwargs)
+    elif feature:
         lingtreemaps.plot(df, tree, feature_df, **kwargs)
     else:
         lingtreemaps.plot(df, tree, **kwargs)
+    if profile_path:
+        profile.save(profile_path)
+        log.info(f"Saved the profile to {profile_path}:\n{profile}")
 
 
 @main.command()
-@click.argument("glottocode")
+@click.argument("glottocodes", nargs=-1, required=True)
 @click.option(
     "-l",
     "--languages",
@@ -95,25 +154,75 @@ def plot(
     show_default=True,
     help="Where to store the downloaded data.",
 )
-def download_tree(glottocode, languages, output_dir, get_languages, plot):
-    """GLOTTOCODE: The glottocode of the root of the tree you want to download."""
+@click.option(
+    "-j",
+    "--jobs",
+    "workers",
+    default=8,
+    show_default=True,
+    help="How many trees to download at the same time.",
+)
+@click.option(
+    "--cache",
+    "cache_dir",
+    default=None,
+    help="Where to cache downloaded trees (default: ~/.cache/lingtreemaps/glottolog).",
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    default=False,
+    help="Only use cached trees.",
+)
+@click.option(
+    "--index",
+    default=None,
+    help="The languoid index for --get-languages (see ``index-glottolog``).",
+)
+def download_tree(
+    glottocodes,
+    languages,
+    output_dir,
+    get_languages,
+    plot,
+    workers,
+    cache_dir,
+    offline,
+    index,
+):  # pylint: disable=too-many-arguments
+    """GLOTTOCODES: The glottocodes of the roots of the trees you want to
+    download."""
+    from Bio import Phylo
+    from lingtreemaps.glottolog import download_glottolog_trees
+    from lingtreemaps.glottolog import get_glottolog_cache
+    from lingtreemaps.helpers import read_data_file
+
+    dfs = {}
+    df = None
     if get_languages:
-        df = lingtreemaps.get_glottolog_csv(glottocode)
-        df.to_csv(Path(output_dir) / f"{glottocode}.csv", index=False)
+        import pandas as pd
+
+        for glottocode in glottocodes:
+            dfs[glottocode] = lingtreemaps.get_glottolog_csv(glottocode, index)
+            dfs[glottocode].to_csv(Path(output_dir) / f"{glottocode}.csv", index=False)
+        # a tree only contains languages from the table of its root
+        df = pd.concat(dfs.values())
     elif languages:
         df = read_data_file(languages)
+        dfs = dict.fromkeys(glottocodes, df)
     else:
         log.warning(
             "If you do not provide CSV file with the language list, dialects without "
             "coordinates will show up in the tree."
         )
-        df = None
-    tree = lingtreemaps.download_glottolog_tree(root=glottocode, df=df)
-    Phylo.draw_ascii(tree)
-    Phylo.write(tree, Path(output_dir) / f"{glottocode}.nwk", "newick")
-    kwargs = dict(filename=glottocode, file_format="svg")
-    if plot:
-        lingtreemaps.plot(df, tree, **kwargs)
+    cache = get_glottolog_cache(cache_dir, offline=offline)
+    trees = download_glottolog_trees(glottocodes, df, cache, workers)
+    for glottocode, tree in trees.items():
+        Phylo.draw_ascii(tree)
+        Phylo.write(tree, Path(output_dir) / f"{glottocode}.nwk", "newick")
+        if plot:
+            kwargs = dict(filename=glottocode, file_format="svg")
+            lingtreemaps.plot(dfs.get(glottocode), tree, **kwargs)
 
 
 @main.command()
@@ -125,16 +234,174 @@ def download_tree(glottocode, languages, output_dir, get_languages, plot):
     default=".",
     help="Where to store the downloaded data.",
 )
-def get_language_data(glottocode, output_dir):
+@click.option(
+    "--index",
+    default=None,
+    help="The languoid index (default: ~/.cache/lingtreemaps/glottolog).",
+)
+def get_language_data(glottocode, output_dir, index):
     """Note: for this to work, you need to install cldfbench and download
-        the glottolog catalog.
+        the glottolog catalog (or have run ``index-glottolog``).
 
     GLOTTOCODE: The glottocode of the root of the tree you want to download the language
     list for."""
-    df = lingtreemaps.get_glottolog_csv(glottocode)
+    df = lingtreemaps.get_glottolog_csv(glottocode, index)
     df.to_csv(Path(output_dir) / f"{glottocode}.csv", index=False)
     return df
 
 
+@main.command()
+@click.option(
+    "--repo",
+    default=None,
+    help="Path to a glottolog repository (default: the catalog configured in "
+    "cldfbench).",
+)
+@click.option(
+    "-o",
+    "--output",
+    "path",
+    default=None,
+    help="Where to store the index (default: ~/.cache/lingtreemaps/glottolog).",
+)
+def index_glottolog(repo, path):
+    """Import the languoids of the glottolog catalog into a local index, used
+    by ``get-language-data`` and ``download-tree -g``. Run this again after
+    updating the catalog."""
+    from lingtreemaps.languoids import LanguoidIndex
+    from lingtreemaps.languoids import catalog_records
+
+    LanguoidIndex(path).build(catalog_records(repo))
+
+
+@main.command()
+@click.argument("manifest")
+@click.option(
+    "-j",
+    "--jobs",
+    "processes",
+    default=None,
+    type=int,
+    help="How many maps to render at the same time (default: one per CPU).",
+)
+@click.option(
+    "-o",
+    "--output",
+    "output_dir",
+    default=".",
+    show_default=True,
+    help="Where to store the created maps.",
+)
+@click.option(
+    "--render-cache",
+    default=None,
+    help="Copy unchanged maps from this directory instead of plotting them.",
+)
+def batch(manifest, processes, output_dir, render_cache):
+    """MANIFEST: A YAML list of jobs, each with the keys ``languages`` and
+    ``tree`` and optionally ``feature``, ``text``, ``conf`` and ``output``.
+    Paths are relative to the manifest."""
+    from lingtreemaps.batch import run_batch
+
+    results = run_batch(
+        manifest,
+        processes=processes,
+        output_dir=output_dir,
+        render_cache=render_cache,
+    )
+    failed = [x for x in results if x["error"]]
+    log.info(f"Rendered {len(results) - len(failed)} of {len(results)} maps.")
+    if failed:
+        sys.exit(1)
+
+
+@main.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Address to bind.")
+@click.option("--port", default=8080, show_default=True, help="Port to listen on.")
+@click.option(
+    "--socket",
+    "socket_path",
+    default=None,
+    help="Listen on this unix socket instead of a port.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    "processes",
+    default=None,
+    type=int,
+    help="How many maps to render at the same time (default: one per CPU).",
+)
+@click.option(
+    "--queue",
+    "queue_size",
+    default=None,
+    type=int,
+    help="How many requests may wait for a worker before further ones are "
+    "rejected (default: as many as there are workers).",
+)
+@click.option(
+    "--timeout",
+    default=60.0,
+    show_default=True,
+    help="Seconds after which a request gets an error instead of its map.",
+)
+@click.option(
+    "--render-cache",
+    default=None,
+    help="Copy unchanged maps from this directory instead of plotting them.",
+)
+@click.option(
+    "--allow-tile-urls",
+    "tile_urls",
+    is_flag=True,
+    default=False,
+    help="Let requests give tile URLs as ``cx_provider``, not only the names of "
+    "xyzservices providers. The server then fetches any URL a client sends.",
+)
+def serve(
+    host, port, socket_path, processes, queue_size, timeout, render_cache, tile_urls
+):  # pylint: disable=too-many-arguments
+    """Render maps for HTTP requests, in worker processes which keep the
+    background layers and recently used trees loaded.
+
+    ``POST /plot`` takes a JSON object with ``languages`` and ``tree`` and
+    optionally ``feature``, ``text`` (tables as CSV text or lists of records),
+    ``conf`` and ``format`` (``svg``, ``png`` or ``pdf``) and returns the map.
+    ``GET /health`` and ``GET /metrics`` report the state of the server."""
+    from lingtreemaps.server import serve as serve_maps
+
+    try:
+        serve_maps(
+            host,
+            port,
+            socket_path,
+            processes=processes,
+            queue_size=queue_size,
+            timeout=timeout,
+            render_cache=render_cache,
+            tile_urls=tile_urls,
+        )
+    except KeyboardInterrupt:
+        log.info("Stopped the server.")
+
+
+@main.command()
+@click.option(
+    "-o",
+    "--output",
+    "output_dir",
+    default=None,
+    help="Where to store the converted layers (default: "
+    "~/.cache/lingtreemaps/backgrounds, which is preferred to the package data).",
+)
+def build_backgrounds(output_dir):
+    """Convert the background shapefiles to the compact format with several
+    levels of detail used for plotting."""
+    from lingtreemaps import background
+
+    background.build_compact_layers(output_dir)
+
+
 if __name__ == "__main__":
     sys.exit(main())  # pragma: no cover
@@ -0,0 +1,155 @@
+"""Colors and hatches of feature values."""
+import functools
+import matplotlib
+import matplotlib.patches
+import pandas as pd
+from matplotlib.patches import Patch
+
+
+HATCHES = ["///", "\\\\\\", "|||", "---", "+++", "xxx", "ooo", "O00", "...", "***"]
+
+# hatches are white; before matplotlib 3.10, their color could only be set
+# in rcParams (see white_hatches)
+if hasattr(Patch, "set_hatchcolor"):
+    HATCH_STYLE = {"hatchcolor": "white"}
+else:  # pragma: no cover
+    HATCH_STYLE = {}
+
+# fake coordinates (in antarctica) of the markers making sure that every
+# hatch pattern is rendered
+DUMMY_COORDS = (-83.747128, 2.431754)
+
+
+def white_hatches(func):
+    """Decorates ``func`` to draw white hatches on matplotlib versions without
+    per-artist hatch colors, by setting ``hatch.color`` only while it runs"""
+    if HATCH_STYLE:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with matplotlib.rc_context({"hatch.color": "white"}):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class FeatureColors:
+    """Values of a feature, inserted into the language table, and their colors.
+
+    ``languages`` is the language table with the columns of ``feature_df`` and
+    a ``color`` column; without ``feature_df``, all languages get
+    ``default_color``. ``clade_colors`` and ``node_colors`` give the color of
+    every ID (from its last and first row, respectively).
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        lg_df,
+        feature_df=None,
+        id_col="ID",
+        seaborn_palette="bright",
+        color_dict=None,
+        hatch_dict=None,
+        hatching=False,
+        default_color="orange",
+    ):
+        self.default_color = default_color
+        self.hatching = hatching
+        self.has_values = feature_df is not None
+        if feature_df is not None:
+            if "Clade" not in feature_df.columns or "Value" not in feature_df.columns:
+                raise ValueError(
+                    "Feature dataframe has to have columns 'Clade' and 'Value'"
+                )
+            lg_df = pd.merge(
+                lg_df, feature_df, left_on=id_col, right_on="Clade", how="outer"
+            )  # insert feature values into language table
+            lg_df[id_col] = lg_df.apply(
+                lambda x: x["Clade"] if pd.isnull(x[id_col]) else x[id_col], axis=1
+            )
+            values = []
+            for x in list(feature_df["Value"]):
+                if x not in values:
+                    values.append(x)
+            if color_dict is None:
+                import seaborn as sns  # pylint: disable=import-outside-toplevel
+
+                palette = sns.color_palette(
+                    seaborn_palette, len(values)
+                )  # generate palette
+                self.value_colors = dict(
+                    zip(values, palette.as_hex())
+                )  # what value corresponds to what color?
+            else:
+                self.value_colors = color_dict
+            if hatching and hatch_dict is None:
+                self.value_hatches = dict(zip(values, HATCHES))
+                hatch_dict = {}
+            else:
+                self.value_hatches = hatch_dict
+            lg_df["color"] = lg_df["Value"].apply(
+                lambda x: self.value_colors.get(x, (0, 0, 0, 0))
+            )  # use transparent color for missing values
+            self.clade_colors = dict(
+                zip(lg_df[id_col], lg_df["color"])
+            )  # what (leaf) name corresponds to what color?
+        else:
+            lg_df = lg_df.assign(color=default_color)
+            self.clade_colors = {}
+            self.value_colors = {}
+            self.value_hatches = hatch_dict
+        # the hatch patterns markers are actually drawn with
+        self.hatches = hatch_dict or {}
+        self.languages = lg_df
+
+        # Hack for cases where a value only occurs once
+        if hatching:
+            self.dummies = pd.DataFrame.from_dict(
+                [
+                    {
+                        "ID": f"dummy_{value}",
+                        "color": self.value_colors[value],
+                        "Value": value,
+                        "Latitude": DUMMY_COORDS[0],
+                        "Longitude": DUMMY_COORDS[1],
+                    }
+                    for value in (self.value_hatches or {})
+                ]
+            )
+            markers = pd.concat([lg_df, self.dummies])
+        else:
+            markers = lg_df
+        first_entries = markers.drop_duplicates(subset=id_col)
+        self.node_colors = dict(zip(first_entries[id_col], first_entries["color"]))
+        self.markers = markers
+
+    def edge_colors(self, names, root, color_tree):
+        """Colors of the lines leading to the clades called ``names``;
+        ``root`` is the position of the root clade"""
+        colors = [
+            self.node_colors.get(name, "black") if color_tree else "black"
+            for name in names
+        ]
+        colors[root] = self.clade_colors.get(names[root], "black")
+        return colors
+
+    def legend_handles(self):
+        # https://www.python-graph-gallery.com/how-to-use-rectangles-in-matplotlib-legends
+        if self.hatching:
+            return [
+                matplotlib.patches.Circle(
+                    (0.5, 0.5),
+                    1,
+                    label=label,
+                    facecolor=self.value_colors.get(label, self.default_color),
+                    linewidth=3,
+                    hatch=(self.value_hatches or {}).get(label, None),
+                    **HATCH_STYLE,
+                )
+                for label, color in self.value_colors.items()
+            ]
+        return [
+            Patch(facecolor=color, label=label)
+            for label, color in self.value_colors.items()
+        ]
@@ -0,0 +1,68 @@
+"""Lines connecting the leaves of the tree with the points on the map."""
+import numpy as np
+from matplotlib.collections import LineCollection
+
+
+class LeafConnectors(LineCollection):
+    """All leaf-to-map connectors as a single collection.
+
+    The lines look like the arrows drawn by ``ax.annotate(arrowprops=...)``
+    with ``relpos=(1, 0.5)``: if a segment has a leaf label, it starts at the
+    right side of the (padded) label, and every segment stops ``shrink``
+    points short of its map point. As label extents are only known when
+    rendering, the segments are recomputed every time the collection is drawn.
+
+    ``starts`` and ``ends`` are in data coordinates; ``label_ids`` holds the
+    position of the label of every segment in ``labels`` (or -1).
+    """
+
+    def __init__(self, starts, ends, labels=(), label_ids=None, shrink=2, **kwargs):
+        self.starts = np.asarray(starts, dtype=float).reshape(-1, 2)
+        self.ends = np.asarray(ends, dtype=float).reshape(-1, 2)
+        self.labels = list(labels)
+        if label_ids is None:
+            label_ids = np.full(len(self.starts), -1)
+        self.label_ids = np.asarray(label_ids, dtype=int)
+        self.shrink = shrink
+        super().__init__(np.stack([self.starts, self.ends], axis=1), **kwargs)
+
+    def draw(self, renderer):
+        if not self.get_visible() or not len(self.starts):
+            return
+        trans = self.axes.transData
+        starts = trans.transform(self.starts)
+        ends = trans.transform(self.ends)
+        pad = renderer.points_to_pixels(self.shrink)
+        labeled = self.label_ids >= 0
+        if labeled.any() and self.labels:
+            extents = np.array(
+                [label.get_window_extent(renderer).extents for label in self.labels]
+            ).reshape(-1, 4)[self.label_ids[labeled]]
+            x0, y0, x1, y1 = extents.T
+            begin = np.column_stack([x1, (y0 + y1) / 2])
+            direction = ends[labeled] - begin
+            # leave the label box (padded by 2 points on every side)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                exit_x = np.where(
+                    direction[:, 0] > 0, pad, x1 - x0 + pad
+                ) / np.abs(direction[:, 0])
+                exit_y = ((y1 - y0) / 2 + pad) / np.abs(direction[:, 1])
+            exit_at = np.clip(np.fmin(exit_x, exit_y), 0, 1)
+            exit_at[~np.isfinite(exit_at)] = 0
+            starts[labeled] = begin + direction * exit_at[:, None]
+            # non-empty labels are drawn from their box, empty ones from their anchor
+            empty = np.array([not label.get_text() for label in self.labels])
+            if empty.any():
+                empty_segments = np.flatnonzero(labeled)[empty[self.label_ids[labeled]]]
+                starts[empty_segments] = trans.transform(self.starts[empty_segments])
+        # stop short of the map point
+        direction = ends - starts
+        length = np.hypot(*direction.T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            shrink_by = np.clip(np.nan_to_num(pad / length, posinf=1), 0, 1)
+        ends = ends - direction * shrink_by[:, None]
+        inverted = trans.inverted()
+        self.set_segments(
+            np.stack([inverted.transform(starts), inverted.transform(ends)], axis=1)
+        )
+        super().draw(renderer)
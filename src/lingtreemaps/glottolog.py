@@ -0,0 +1,203 @@
+"""Glottolog trees, downloaded with a shared HTTP session and cached on disk."""
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from pathlib import Path
+import requests
+from Bio import Phylo
+from Bio.Phylo.Newick import Tree
+from requests.adapters import HTTPAdapter
+from lingtreemaps.helpers import cache_dir
+from lingtreemaps.helpers import remove_file
+
+
+log = logging.getLogger(__name__)
+
+GLOTTOLOG_URL = "https://glottolog.org"
+USER_AGENT = "lingtreemaps"
+GLOTTOCODE = re.compile(r"^[a-z0-9]{4}[0-9]{4}$")
+LABEL_GLOTTOCODE = re.compile(r"\[([a-z0-9]{4}[0-9]{4})\]")
+
+
+def default_cache_dir():
+    return cache_dir("glottolog")
+
+
+def glottolog_url(url=None):
+    url = url or os.environ.get("LINGTREEMAPS_GLOTTOLOG_URL") or GLOTTOLOG_URL
+    return url.rstrip("/")
+
+
+class GlottologCache:
+    """Newick trees of glottolog languoids, stored in ``directory`` by
+    glottocode.
+
+    Trees are downloaded from ``url`` (default: the ``LINGTREEMAPS_GLOTTOLOG_URL``
+    environment variable or glottolog.org) with a pooled session of up to
+    ``connections`` connections. Cached trees are revalidated with their
+    ``ETag`` and ``Last-Modified`` headers and used as they are if the server
+    cannot be reached. In ``offline`` mode, only cached trees are served and
+    missing ones raise a ``FileNotFoundError``.
+    """
+
+    def __init__(self, directory=None, url=None, offline=False, connections=8):
+        self.directory = Path(directory or default_cache_dir())
+        self.url = glottolog_url(url)
+        self.offline = offline
+        self.session = requests.Session()
+        self.session.headers["user-agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_maxsize=connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def newick_url(self, glottocode):
+        return f"{self.url}/resource/languoid/id/{glottocode}.newick.txt"
+
+    def path(self, glottocode):
+        if not GLOTTOCODE.match(glottocode):
+            raise ValueError(f"Invalid glottocode: {glottocode}")
+        return self.directory / f"{glottocode}.newick"
+
+    def validators(self, glottocode):
+        """Request headers for revalidating the cached tree"""
+        try:
+            with open(
+                self.path(glottocode).with_suffix(".json"), "r", encoding="utf-8"
+            ) as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def get(self, glottocode):
+        """The newick tree of the languoid ``glottocode``, as a string"""
+        path = self.path(glottocode)
+        try:
+            cached = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            cached = None
+        if self.offline:
+            if cached is None:
+                raise FileNotFoundError(
+                    f"The tree of {glottocode} is not cached (offline mode)"
+                )
+            return cached
+        headers = self.validators(glottocode) if cached is not None else {}
+        url = self.newick_url(glottocode)
+        log.debug(f"Downloading {url}")
+        # without a response, or with a server error, the cached tree is used
+        try:
+            response = self.session.get(url, headers=headers, timeout=20)
+            if response.status_code >= 500:
+                response.raise_for_status()
+        except requests.RequestException as e:
+            if cached is None:
+                raise
+            log.warning(f"Could not download {glottocode} ({e}), using the cached tree")
+            return cached
+        if response.status_code == 304 and cached is not None:
+            return cached
+        response.raise_for_status()
+        self.put(glottocode, response.text, response.headers)
+        return response.text
+
+    def put(self, glottocode, newick, headers=None):
+        path = self.path(glottocode)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        headers = headers or {}
+        meta = {
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        suffix = f"{os.getpid()}.{threading.get_ident()}"
+        for target, content in [
+            (path, newick),
+            (path.with_suffix(".json"), json.dumps(meta)),
+        ]:
+            temp_path = target.with_name(f"{target.name}.{suffix}")
+            temp_path.write_text(content, encoding="utf-8")
+            os.replace(temp_path, target)
+
+    def clear(self):
+        for path in self.directory.glob("*.newick"):
+            remove_file(path)
+            remove_file(path.with_suffix(".json"))
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_glottolog_cache(directory=None, url=None, offline=False):
+    """A shared :class:`GlottologCache` (and HTTP session) for every
+    directory and server"""
+    directory = Path(directory or default_cache_dir()).resolve()
+    url = glottolog_url(url)
+    with _caches_lock:
+        if (directory, url) not in _caches:
+            _caches[directory, url] = GlottologCache(directory, url, offline)
+        cache = _caches[directory, url]
+    cache.offline = offline
+    return cache
+
+
+def label_glottocode(label):
+    """The glottocode in a glottolog newick label like
+    ``'Wayana [waya1269][way]-l-'``"""
+    match = LABEL_GLOTTOCODE.search(label or "")
+    return match.group(1) if match else label
+
+
+def glottolog_tree(newick, root=None, languages=None):
+    """Reads a glottolog newick tree, in a single traversal.
+
+    Clades are named by their glottocode and get a branch length of 1.
+    Clades of ``languages`` (glottocodes) become leaves, dropping their
+    dialects. Returns the subtree of ``root``, if given.
+    """
+    tree = Phylo.read(StringIO(newick), "newick")
+    languages = set(languages if languages is not None else [])
+    subtree = None
+    stack = [tree.root]
+    while stack:
+        clade = stack.pop()
+        clade.name = label_glottocode(clade.name)
+        clade.branch_length = 1
+        if subtree is None and clade.name == root:
+            subtree = clade
+        if clade.name in languages:
+            clade.clades = []
+        else:
+            stack.extend(reversed(clade.clades))
+    if subtree is None or subtree is tree.root:
+        return tree
+    return Tree(root=subtree, rooted=tree.rooted)
+
+
+def download_glottolog_tree(root, df=None, cache=None):
+    """The glottolog tree of ``root``, labeled with glottocodes. Clades of
+    languages in ``df`` are collapsed to a single leaf. Trees are read
+    through ``cache`` (a :class:`GlottologCache`)."""
+    cache = cache or get_glottolog_cache()
+    languages = df["ID"] if df is not None else None
+    return glottolog_tree(cache.get(root), root, languages)
+
+
+def download_glottolog_trees(roots, df=None, cache=None, workers=8):
+    """Downloads the trees of several ``roots`` at the same time (in at most
+    ``workers`` threads), returns them by root. See
+    :func:`download_glottolog_tree`."""
+    roots = list(roots)
+    cache = cache or get_glottolog_cache()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(roots)))) as pool:
+        trees = pool.map(lambda root: download_glottolog_tree(root, df, cache), roots)
+        return dict(zip(roots, trees))
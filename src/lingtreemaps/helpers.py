@@ -1,13 +1,141 @@
 import importlib
 import logging
+import os
+import threading
+from collections import OrderedDict
 from pathlib import Path
-import pandas as pd
+import numpy as np
+import shapely
+
+
+try:
+    from importlib.resources import files  # pragma: no cover
+except ImportError:  # pragma: no cover
+    from importlib_resources import files  # pragma: no cover
 
 
 log = logging.getLogger(__name__)
+data_path = files("lingtreemaps") / "data"
+
+
+def cache_dir(name):
+    """The default directory for cached downloads of a kind (``name``)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "lingtreemaps" / name
+
+
+class LRUCache:
+    """A thread-safe cache of at most ``maxsize`` values in memory; the least
+    recently used ones are evicted first. Cached values are shared and must
+    not be modified in place."""
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def keys(self):
+        return list(self._values)
+
+    def get(self, key, load):
+        """Returns the value stored under ``key``, calling ``load()`` if needed"""
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                return self._values[key]
+        value = load()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            self._evict()
+        return value
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self):
+        while len(self._values) > max(self.maxsize, 0):
+            evicted, _ = self._values.popitem(last=False)
+            log.debug(f"Evicted {evicted} from {type(self).__name__}")
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def remove_file(path):
+    """Deletes a file if it exists (``Path.unlink(missing_ok=True)`` needs
+    Python 3.8)"""
+    try:
+        Path(path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+class DiskCache:
+    """Files in the subdirectories of ``directory``, holding at most
+    ``max_size`` bytes; beyond that, the least recently used files are
+    deleted."""
+
+    def __init__(self, directory, max_size):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self._size = None
+        self._lock = threading.Lock()
+
+    def store(self, path, data):
+        """Writes ``data`` to ``path`` (in the cache) atomically"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+        with self._lock:
+            if self._size is None:
+                self._size = self.size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_size:
+                self._size = self.evict()
+
+    def files(self):
+        return [x for x in self.directory.glob("*/*") if x.is_file()]
+
+    def size(self):
+        """The size of all cached files, in bytes"""
+        return sum(x.stat().st_size for x in self.files())
+
+    def evict(self):
+        """Deletes the least recently used files until the cache is small
+        enough, returns its new size"""
+        files = sorted(
+            ((x.stat(), x) for x in self.files()), key=lambda x: x[0].st_mtime
+        )
+        size = sum(stat.st_size for stat, _ in files)
+        for stat, path in files:
+            if size <= self.max_size:
+                break
+            remove_file(path)
+            size -= stat.st_size
+        return size
+
+    def clear(self):
+        with self._lock:
+            for path in self.files():
+                remove_file(path)
+            self._size = 0
 
 
 def read_data_file(filename, **kwargs):
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     filename = Path(filename)
     if filename.suffix == ".csv":
         return pd.read_csv(filename, **kwargs)
@@ -21,3 +149,57 @@ def read_data_file(filename, **kwargs):
         return pd.read_excel(filename, **kwargs)
 
     raise ValueError("Tabular data must be in .csv or .xlsx format")
+
+
+def rotation_matrix(angle, origin):
+    """Affine matrix rotating by ``angle`` degrees around ``origin`` (x, y),
+    like ``shapely.affinity.rotate``"""
+    cos = np.cos(np.radians(angle))
+    sin = np.sin(np.radians(angle))
+    if abs(cos) < 2.5e-16:
+        cos = 0.0
+    if abs(sin) < 2.5e-16:
+        sin = 0.0
+    x0, y0 = origin
+    return np.array(
+        [
+            [cos, -sin, x0 - x0 * cos + y0 * sin],
+            [sin, cos, y0 - x0 * sin - y0 * cos],
+        ]
+    )
+
+
+def rotate_coords(x, y, angle, origin):
+    """Rotates arrays of x and y coordinates"""
+    matrix = rotation_matrix(angle, origin)
+    coords = np.column_stack([x, y]) @ matrix[:, :2].T + matrix[:, 2]
+    return coords[:, 0], coords[:, 1]
+
+
+def rotate_geometries(geometries, angle, origin):
+    """Rotates a geometry or an array of geometries in a single transformation"""
+    matrix = rotation_matrix(angle, origin)
+    return shapely.transform(
+        geometries, lambda coords: coords @ matrix[:, :2].T + matrix[:, 2]
+    )
+
+
+def new_figure():
+    """A figure with an Agg canvas and a single axes filling it.
+
+    The figure is not registered with pyplot, so figures can be created
+    (and rendered) in several threads at once.
+    """
+    # pylint: disable=import-outside-toplevel
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig, fig.add_axes([0, 0, 1, 1])
+
+
+def close_figure(fig):
+    """Removes everything from a figure, releasing its memory right away
+    instead of waiting for the garbage collector"""
+    fig.clear()
@@ -0,0 +1,172 @@
+"""A local index of glottolog languoids, imported once from the catalog."""
+import logging
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+import pandas as pd
+from lingtreemaps.helpers import cache_dir
+from lingtreemaps.helpers import remove_file
+
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ["glottocode", "parent", "level", "name", "latitude", "longitude"]
+SCHEMA = """
+CREATE TABLE languoid (
+    glottocode TEXT PRIMARY KEY,
+    parent TEXT,
+    level TEXT,
+    name TEXT,
+    latitude REAL,
+    longitude REAL,
+    lft INTEGER NOT NULL,
+    rgt INTEGER NOT NULL
+);
+CREATE INDEX languoid_lft ON languoid (lft);
+"""
+# a languoid and its descendants, in tree order (nested sets)
+DESCENDANTS = """
+SELECT d.glottocode, d.parent, d.level, d.name, d.latitude, d.longitude
+FROM languoid AS r JOIN languoid AS d ON d.lft BETWEEN r.lft AND r.rgt
+WHERE r.glottocode = ?
+ORDER BY d.lft
+"""
+
+
+def default_index_path():
+    return cache_dir("glottolog") / "languoids.sqlite"
+
+
+def nested_sets(records):
+    """Numbers the languoids (``glottocode`` and ``parent`` are the first
+    two fields of every record) in a depth-first traversal: the descendants
+    of a languoid are those between its ``lft`` and ``rgt``. Languoids with
+    unknown parents are treated as roots. Returns ``{glottocode: (lft, rgt)}``.
+    """
+    children = {}
+    codes = {record[0] for record in records}
+    roots = []
+    for code, parent, *_ in records:
+        if parent in codes:
+            children.setdefault(parent, []).append(code)
+        else:
+            roots.append(code)
+    numbers = {}
+    counter = 0
+    stack = [(code, False) for code in reversed(roots)]
+    while stack:
+        code, finished = stack.pop()
+        if finished:
+            numbers[code] = (numbers[code], counter)
+            counter += 1
+            continue
+        numbers[code] = counter
+        counter += 1
+        stack.append((code, True))
+        stack.extend((x, False) for x in reversed(children.get(code, [])))
+    return numbers
+
+
+class LanguoidIndex:
+    """Glottolog languoids (glottocode, parent, level, name and coordinates)
+    in an SQLite database at ``path``, with nested sets for querying all
+    descendants of a languoid at once."""
+
+    def __init__(self, path=None):
+        self.path = Path(path or default_index_path())
+
+    def exists(self):
+        return self.path.is_file()
+
+    def connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def build(self, records):
+        """Replaces the index with ``records`` (tuples of :data:`COLUMNS`)"""
+        records = [tuple(x) for x in records]
+        numbers = nested_sets(records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(f"{self.path.name}.tmp")
+        remove_file(temp_path)
+        with closing(sqlite3.connect(temp_path)) as con:
+            con.executescript(SCHEMA)
+            con.executemany(
+                "INSERT INTO languoid VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [record + numbers[record[0]] for record in records],
+            )
+            con.commit()
+        temp_path.replace(self.path)
+        log.info(f"Indexed {len(records)} languoids in {self.path}")
+
+    def languoid(self, glottocode):
+        with self.connect() as con:
+            row = con.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM languoid WHERE glottocode = ?",
+                (glottocode,),
+            ).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def descendants(self, glottocode, level=None):
+        """A DataFrame with the descendants of ``glottocode`` (only those of
+        ``level``, if given), in tree order"""
+        with self.connect() as con:
+            rows = con.execute(DESCENDANTS, (glottocode,)).fetchall()
+        if not rows:
+            raise KeyError(f"Unknown glottocode: {glottocode}")
+        df = pd.DataFrame(rows[1:], columns=COLUMNS)
+        if level:
+            df = df[df["level"] == level]
+        return df.reset_index(drop=True)
+
+
+def catalog_records(repo=None):
+    """The languoids of a glottolog catalog (default: the one configured in
+    cldfbench), as records for :meth:`LanguoidIndex.build`"""
+    try:
+        from cldfbench.catalogs import (  # pylint: disable=import-outside-toplevel
+            Glottolog,
+        )
+        from cldfbench.catalogs import (  # pylint: disable=import-outside-toplevel
+            pyglottolog,
+        )
+    except ImportError:
+        log.error("Please run pip install cldfbench[glottolog]")
+        sys.exit()
+    glottolog = pyglottolog.Glottolog(repo or Glottolog.from_config().repo.working_dir)
+    for languoid in glottolog.languoids():
+        yield (
+            languoid.id,
+            languoid.lineage[-1][1] if languoid.lineage else None,
+            languoid.level.id,
+            languoid.name,
+            languoid.latitude,
+            languoid.longitude,
+        )
+
+
+def get_index(path=None, repo=None):
+    """The languoid index at ``path``, imported from the glottolog catalog
+    (``repo``) if it does not exist yet"""
+    index = LanguoidIndex(path)
+    if not index.exists():
+        log.info(f"Importing the glottolog catalog to {index.path} (only once)")
+        index.build(catalog_records(repo))
+    return index
+
+
+def get_glottolog_csv(glottocode, index=None):
+    """The languages below ``glottocode`` which have coordinates, from a
+    local :class:`LanguoidIndex` (at ``index``). The index is imported from
+    the glottolog catalog the first time."""
+    df = get_index(index).descendants(glottocode, level="language")
+    df = df.rename(
+        columns={
+            "glottocode": "ID",
+            "latitude": "Latitude",
+            "longitude": "Longitude",
+            "name": "Name",
+        }
+    )[["ID", "Latitude", "Longitude", "Name"]]
+    df = df[~(pd.isnull(df["Latitude"]))]
+    return df
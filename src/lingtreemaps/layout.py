@@ -0,0 +1,286 @@
+"""Positions of the tree, its leaves and the map, independent of any feature."""
+import geopandas as gpd
+import numpy as np
+import shapely.geometry
+from lingtreemaps.clades import CladeIndex
+from lingtreemaps.clades import sort_tree
+from lingtreemaps.helpers import rotate_coords
+from lingtreemaps.profiling import NO_PROFILE
+
+
+def located_points(df):
+    """The rows of a language table with coordinates, as a GeoDataFrame"""
+    gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.Longitude, df.Latitude))
+    return gdf.dropna(subset=["Latitude", "Longitude"])
+
+
+class Layout:
+    """The geometry of a tree map, as NumPy arrays.
+
+    Nodes (clades) are numbered in post-order: ``node_names``, ``parent``
+    (-1 for the root), ``node_x`` and ``node_y`` are indexed by node,
+    ``preorder`` lists the nodes in drawing order and ``leaves`` the names of
+    the leaves in tree order (from the bottom of the picture to the top).
+    ``segments`` (n, 2, 2) are the tree lines, drawn for the nodes in
+    ``segment_owners``.
+
+    Leaves with map points are listed (in preorder) in ``labeled_leaves``,
+    with the row of their first point (in the located, rotated points) in
+    ``label_rows``. Every connector leads from the leaf ``connector_leaves``
+    (a position in ``labeled_leaves``) to the point in row ``connector_rows``
+    at ``connector_ends``.
+
+    ``bounds`` is the box around the points, ``visible_map`` the box of the
+    map and ``outer_bounds`` the box of the whole picture. Layouts do not
+    depend on matplotlib and can be stored with :meth:`save`.
+    """
+
+    arrays = [
+        "leaves",
+        "node_names",
+        "parent",
+        "preorder",
+        "node_x",
+        "node_y",
+        "segments",
+        "segment_owners",
+        "labeled_leaves",
+        "label_rows",
+        "connector_leaves",
+        "connector_rows",
+        "connector_ends",
+        "bounds",
+        "visible_map",
+        "outer_bounds",
+        "center",
+    ]
+    scalars = [
+        "rotation",
+        "tree_depth",
+        "tree_map_padding",
+        "base_padding",
+        "internal_map_padding_x",
+        "internal_map_padding_y",
+        "external_map_padding",
+        "leaf_spacing",
+        "tree_baseline",
+        "sideline",
+    ]
+
+    def __init__(self, **fields):
+        for name in self.arrays:
+            setattr(self, name, np.asarray(fields[name]))
+        for name in self.scalars:
+            setattr(self, name, fields[name])
+
+    def __eq__(self, other):
+        if not isinstance(other, Layout):
+            return NotImplemented
+        return all(
+            np.array_equal(getattr(self, name), getattr(other, name))
+            for name in self.arrays + self.scalars
+        )
+
+    __hash__ = None
+
+    def save(self, path):
+        """Writes the layout to an (uncompressed) ``.npz`` file"""
+        fields = self.arrays + self.scalars
+        np.savez(path, **{name: getattr(self, name) for name in fields})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                **{name: data[name] for name in cls.arrays},
+                **{name: data[name].item() for name in cls.scalars},
+            )
+
+    @property
+    def root(self):
+        return int(np.flatnonzero(self.parent < 0)[0])
+
+    @property
+    def internal(self):
+        """Which nodes have children?"""
+        internal = np.zeros(len(self.parent), dtype=bool)
+        internal[self.parent[self.parent >= 0]] = True
+        return internal
+
+    @property
+    def leaf_coords(self):
+        """Coordinates of the leaves (except a lone root), by name"""
+        leaves = ~self.internal
+        leaves[self.root] = False
+        return {
+            self.node_names[i]: (self.node_x[i], self.node_y[i])
+            for i in self.preorder
+            if leaves[i]
+        }
+
+    @property
+    def data_rect(self):
+        return shapely.geometry.box(*self.bounds)
+
+    @property
+    def visible_map_rect(self):
+        return shapely.geometry.box(*self.visible_map)
+
+    @property
+    def picture_rect(self):
+        return shapely.geometry.box(*self.outer_bounds)
+
+    def rotate(self, gdf):
+        """Returns a copy of ``gdf`` with its points rotated like the map"""
+        x, y = rotate_coords(gdf.geometry.x, gdf.geometry.y, self.rotation, self.center)
+        gdf = gdf.copy()
+        gdf["geometry"] = gpd.points_from_xy(x, y)
+        return gdf
+
+    def label_coords(self, x_offset=0, y_offset=0):
+        """Positions of the leaf labels"""
+        return np.column_stack(
+            [
+                self.node_x[self.labeled_leaves] + x_offset,
+                self.node_y[self.labeled_leaves] - y_offset,
+            ]
+        ).reshape(-1, 2)
+
+
+def compute_layout(  # pylint: disable=too-many-arguments,too-many-locals
+    points,
+    tree,
+    id_col="ID",
+    tree_sort_mode="min",
+    tree_depth=None,
+    tree_map_padding=None,
+    internal_map_padding_x=0.1,
+    internal_map_padding_y=0.1,
+    external_map_padding=0,
+    base_padding=None,
+    rotation=0,
+    debug=False,
+    profile=NO_PROFILE,
+):
+    """Lays out a tree (``Bio.Phylo`` or :class:`~lingtreemaps.trees.ArrayTree`)
+    next to the located languages in ``points`` (a GeoDataFrame, see
+    :func:`located_points`).
+
+    The points are rotated by ``rotation`` degrees around their center and
+    the tree is sorted in place (as the ``sort`` stage of ``profile``).
+    Returns a :class:`Layout`.
+    """
+    bounds = points.geometry.total_bounds  # outer boundaries of the points
+    center = ((bounds[0] + bounds[2]) / 2, (bounds[1] + bounds[3]) / 2)
+    x, y = rotate_coords(points.geometry.x, points.geometry.y, rotation, center)
+    points = points.assign(y=y)
+
+    # per-clade "y" extremes for sorting, gathered in a single traversal
+    with profile.stage("sort"):
+        leaf_y = points.groupby(id_col)["y"]
+        clade_index = CladeIndex(tree, leaf_y.min().to_dict(), leaf_y.max().to_dict())
+        sort_tree(tree, clade_index, tree_sort_mode)
+
+    # how deep does every clade go?
+    clade_depths = clade_index.depths()
+
+    root = clade_index.position[clade_index.tree.root]
+    leaf_count = clade_index.leaf_count[root]
+    bounds = np.array([x.min(), y.min(), x.max(), y.max()])  # tight box
+    map_height = abs(bounds[1] - bounds[3])
+    leaf_spacing = (map_height + internal_map_padding_y * 2) / leaf_count
+
+    # how deep is the entire tree?
+    tree_depth = tree_depth or (bounds[2] - bounds[0]) / 3
+    actual_tree_depth = clade_depths[root]
+    clade_depths = clade_depths * tree_depth / actual_tree_depth
+
+    tree_map_padding = tree_map_padding or tree_depth * 0.2
+    visible_map = np.array(
+        [
+            bounds[0] - internal_map_padding_x,
+            bounds[1] - internal_map_padding_y,
+            bounds[2] + internal_map_padding_x,
+            bounds[3] + internal_map_padding_y,
+        ]
+    )  # larger padding box
+    base_padding = base_padding or tree_depth * 0.05
+    if debug:
+        external_map_padding = base_padding
+    outer_bounds = np.array(
+        [
+            visible_map[0]
+            - external_map_padding
+            - tree_depth
+            - base_padding
+            - tree_map_padding,  # make space for the tree
+            visible_map[1] - external_map_padding,
+            visible_map[2] + external_map_padding,
+            visible_map[3] + external_map_padding,
+        ]
+    )  # bounds of the whole image including the tree
+
+    array_tree = clade_index.tree
+    terminals = array_tree.leaves().tolist()
+    leaf_positions = {}
+    i = 0
+    for leaf in reversed(terminals):
+        leaf_positions[clade_index.clade(leaf)] = i - internal_map_padding_y + 0.02
+        i += leaf_spacing
+    tree_baseline = visible_map[0] - tree_map_padding
+    sideline = bounds[-1] - leaf_spacing * 0.5
+
+    # node coordinates, by clade index
+    node_x = tree_baseline - clade_depths
+    node_y = sideline - clade_index.middles(leaf_positions)
+    segments, segment_owners = clade_index.segments(node_x, node_y)
+
+    preorder = []
+    labeled_leaves = []
+    label_rows = []
+    connector_leaves = []
+    connector_rows = []
+    point_rows = points.groupby(id_col, sort=False).indices
+    names = array_tree.node_names
+    for node in array_tree.preorder().tolist():
+        preorder.append(clade_index.position[node])
+        if node == array_tree.root or not array_tree.is_leaf(node):
+            continue
+        rows = point_rows.get(names[node], [])
+        if len(rows) > 0:
+            labeled_leaves.append(preorder[-1])
+            label_rows.append(rows[0])
+        for row in rows:
+            connector_leaves.append(len(labeled_leaves) - 1)
+            connector_rows.append(row)
+    connector_rows = np.array(connector_rows, dtype=int)
+
+    return Layout(
+        leaves=[names[x] or "" for x in terminals],
+        node_names=[names[x] or "" for x in clade_index.nodes.tolist()],
+        parent=clade_index.parent,
+        preorder=np.array(preorder, dtype=int),
+        node_x=node_x,
+        node_y=node_y,
+        segments=segments,
+        segment_owners=segment_owners,
+        labeled_leaves=np.array(labeled_leaves, dtype=int),
+        label_rows=np.array(label_rows, dtype=int),
+        connector_leaves=np.array(connector_leaves, dtype=int),
+        connector_rows=connector_rows,
+        connector_ends=np.column_stack([x, y])[connector_rows].reshape(-1, 2),
+        bounds=bounds,
+        visible_map=visible_map,
+        outer_bounds=outer_bounds,
+        center=center,
+        rotation=rotation,
+        tree_depth=tree_depth,
+        tree_map_padding=tree_map_padding,
+        base_padding=base_padding,
+        internal_map_padding_x=internal_map_padding_x,
+        internal_map_padding_y=internal_map_padding_y,
+        external_map_padding=external_map_padding,
+        leaf_spacing=leaf_spacing,
+        tree_baseline=tree_baseline,
+        sideline=sideline,
+    )
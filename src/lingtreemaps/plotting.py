@@ -0,0 +1,723 @@
+"""Drawing tree maps."""
+import logging
+import sys
+import typing
+import warnings
+from pathlib import Path
+import Bio.Phylo.Newick
+import geopandas as gpd
+import matplotlib
+import matplotlib.patches
+import pandas as pd
+import shapely
+import shapely.geometry
+import yaml
+from matplotlib import patheffects
+from matplotlib.collections import LineCollection
+from matplotlib.text import Text
+from xyzservices import providers
+from lingtreemaps.background import choose_level
+from lingtreemaps.background import visible_layer
+from lingtreemaps.colors import DUMMY_COORDS
+from lingtreemaps.colors import HATCH_STYLE
+from lingtreemaps.colors import FeatureColors
+from lingtreemaps.colors import white_hatches
+from lingtreemaps.connectors import LeafConnectors
+from lingtreemaps.helpers import close_figure
+from lingtreemaps.helpers import data_path
+from lingtreemaps.helpers import new_figure
+from lingtreemaps.helpers import read_data_file
+from lingtreemaps.layout import compute_layout
+from lingtreemaps.layout import located_points
+from lingtreemaps.profiling import NO_PROFILE
+from lingtreemaps.renders import get_render_cache
+from lingtreemaps.renders import render_key
+from lingtreemaps.tiles import get_cache
+from lingtreemaps.tiles import prefetch
+from lingtreemaps.trees import ArrayTree
+
+
+try:
+    from shapely.errors import ShapelyDeprecationWarning
+
+    warnings.filterwarnings("ignore", category=ShapelyDeprecationWarning)
+except ImportError:
+    pass
+
+log = logging.getLogger(__name__)
+
+
+def get_conf(**kwargs) -> dict:
+    """The default configuration, updated with ``kwargs``"""
+    with open(data_path / "default_config.yaml", "r", encoding="utf-8") as f:
+        conf = yaml.load(f, Loader=yaml.SafeLoader)
+    conf.update(**kwargs)
+    return conf
+
+
+def plot(
+    lg_df: pd.DataFrame,
+    tree: typing.Union[Bio.Phylo.Newick.Tree, ArrayTree],
+    feature_df: typing.Optional[pd.DataFrame] = None,
+    text_df: typing.Optional[pd.DataFrame] = None,
+    **kwargs,
+):
+    """Plots ``tree`` next to a map of the languages in ``lg_df``, colored
+    by ``feature_df``. Returns the ``ax``, or ``None`` if the map was copied
+    from the render cache (``render_cache``).
+
+    To profile the plot, pass a :class:`lingtreemaps.profiling.Profile` as
+    ``profile``; it is filled with the statistics of every stage (``stages``,
+    ``to_dict()``, ``save(path)``)."""
+    if isinstance(text_df, str):
+        text_df = read_data_file(text_df, keep_default_na=False)
+    conf = get_conf(**kwargs)
+    cache = None
+    if conf["filename"] and conf["ax"] is None:
+        cache = get_render_cache(
+            conf["render_cache"], conf["render_cache_size"] * 2**20
+        )
+    if cache:
+        # before plotting, which sorts the tree
+        path = figure_path(conf["filename"], conf["file_format"])
+        key = render_key(lg_df, tree, feature_df, text_df, conf, path)
+        if cache.fetch(key, path):
+            return None
+    ax = plot_map(lg_df, tree, feature_df, text_df, **conf)
+    if cache:
+        cache.put(key, path)
+    return ax
+
+
+def plot_features(
+    lg_df: pd.DataFrame,
+    tree: typing.Union[Bio.Phylo.Newick.Tree, ArrayTree],
+    features: typing.Dict[str, pd.DataFrame],
+    text_df: typing.Optional[pd.DataFrame] = None,
+    **kwargs,
+) -> typing.Dict[str, str]:
+    """Plots several features on the same tree and map.
+
+    ``features`` maps names to feature tables. The tree and the map are laid
+    out and drawn once; for every feature, only colors, hatches and the legend
+    are replaced before saving it as ``{filename}_{name}.{file_format}`` (or
+    ``{name}.{file_format}`` without a ``filename``). Returns the paths of the
+    created maps. Maps in the render cache (``render_cache``) are copied from
+    there, only the other ones are plotted. Like with :func:`plot`, a
+    ``profile`` is filled with the statistics of every stage.
+    """
+    if isinstance(text_df, str):
+        text_df = read_data_file(text_df, keep_default_na=False)
+    conf = get_conf(**kwargs)
+    cache = None
+    if conf["ax"] is None:
+        cache = get_render_cache(
+            conf["render_cache"], conf["render_cache_size"] * 2**20
+        )
+    paths = {}
+    keys = {}
+    missing = dict(features)
+    if cache:
+        for name, feature_df in features.items():
+            path = figure_path(conf["filename"], conf["file_format"], name)
+            keys[name] = render_key(lg_df, tree, feature_df, text_df, conf, path)
+            if cache.fetch(keys[name], path):
+                paths[name] = path
+                del missing[name]
+    if missing:
+        paths.update(plot_map(lg_df, tree, None, text_df, features=missing, **conf))
+        for name in missing:
+            if cache:
+                cache.put(keys[name], paths[name])
+    return {name: paths[name] for name in features}
+
+
+def figure_path(filename, file_format, name=None):
+    """The path of a map saved as ``filename`` (with or without an
+    extension), or of the map of the feature ``name``"""
+    suffix = Path(str(filename)).suffix
+    if suffix:  # dots in directory names are no extensions
+        filename, file_format = str(filename)[: -len(suffix)], suffix[1:]
+    if name is not None:
+        filename = f"{filename}_{name}" if filename else name
+    return f"{filename}.{file_format}"
+
+
+def draw_background(ax, layout, background):
+    """Draws the ``countries`` and ``rivers`` layers in ``background``"""
+    land_color = "white"
+    water_color = "lightgray"
+    outer_bounds = layout.outer_bounds
+    # the background is rotated, too, and only plotted where it is visible,
+    # in a level of detail suitable for the size of the map
+    detail = choose_level(layout.visible_map)
+    rotation, center = layout.rotation, layout.center
+    if "countries" in background:
+        world = visible_layer("countries", outer_bounds, detail, rotation, center)
+        if not world.empty:
+            world.plot(
+                ax=ax,
+                color=land_color,
+                edgecolor="gray",
+                lw=0.7,
+                linestyle="--",
+                zorder=0,
+            )
+    if "rivers" in background:
+        ax.figure.set_facecolor(water_color)
+        waters = visible_layer("rivers", outer_bounds, detail, rotation, center)
+        if not waters.empty:
+            waters.plot(ax=ax, color=water_color, edgecolor="black", lw=1, zorder=1)
+
+
+def draw_layout(  # noqa: MC0001
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+    ax,
+    layout,
+    points,
+    edge_colors,
+    connector_colors,
+    text_df,
+    label_column,
+    print_labels,
+    tree_lw,
+    connection_lw,
+    font_size,
+    text_x_offset,
+    text_y_offset,
+    background,
+    cx_provider,
+    debug,
+    profile=NO_PROFILE,
+):
+    """Draws everything that does not depend on feature values: background
+    layers (the ``background`` stage of ``profile``), tree, leaf labels and
+    connectors. ``points`` are the located
+    languages the layout was computed for, rotated. Returns the tree lines
+    and the connectors, which are colored with ``edge_colors`` (one per
+    segment) and ``connector_colors``. Basemaps are drawn separately, with
+    :func:`draw_basemap`."""
+    outer_bounds = layout.outer_bounds
+
+    if not cx_provider:
+        with profile.stage("background", ax):
+            draw_background(ax, layout, background)
+
+    # cut out visible map box, creating a mask
+    mask = layout.picture_rect.difference(layout.visible_map_rect)
+    mask = gpd.GeoSeries(mask)
+
+    outer_rect = gpd.GeoSeries(layout.picture_rect)
+
+    xlim = [outer_bounds[0], outer_bounds[2]]
+    ylim = [outer_bounds[1], outer_bounds[3]]
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+
+    if debug:
+        ax.grid(color="gray", linestyle="dotted")
+    else:
+        ax.axis("off")
+
+    # add text labels
+    if text_df is not None:
+        for text in text_df.to_dict("records"):
+            ax.text(
+                text["Longitude"],
+                text["Latitude"],
+                s=text["Label"],
+                size=font_size * 0.85,
+                ha="center",
+                color="gray",
+                va="center",
+            )
+
+    outer_rect.plot(ax=ax, edgecolor="black", facecolor="none", zorder=10, lw=1)
+    mask.plot(ax=ax, color="white", alpha=1, edgecolor="black", lw=0.5)
+
+    # all lines of the tree go into a single collection
+    tree_lines = LineCollection(layout.segments, colors=edge_colors, linewidths=tree_lw)
+    ax.add_collection(tree_lines, autolim=False)
+
+    # leaf labels and the lines connecting leaves with the map
+    text_coords = layout.label_coords(text_x_offset, text_y_offset)
+    labels = []
+    if print_labels:
+        label_texts = points[label_column].to_numpy()[layout.label_rows]
+        labels = [
+            Text(x, y, text=text, size=font_size, fontname="Linux Libertine")
+            for (x, y), text in zip(text_coords, label_texts)
+        ]
+    connectors = LeafConnectors(
+        text_coords[layout.connector_leaves],
+        layout.connector_ends,
+        labels=labels,
+        label_ids=layout.connector_leaves if print_labels else None,
+        colors=connector_colors,
+        linewidths=connection_lw,
+        linestyle="dotted",
+        capstyle="round",
+        zorder=3,
+    )
+    ax.add_collection(connectors, autolim=False)
+    for label in labels:
+        ax.add_artist(label)
+
+    if debug:
+        tree_baseline = layout.tree_baseline
+        ax.vlines(x=tree_baseline, ymin=-90, ymax=90, color="blue", linewidth=1)
+        ax.vlines(
+            x=tree_baseline - layout.tree_depth,
+            ymin=-90,
+            ymax=90,
+            color="c",
+            linewidth=1,
+        )
+        ax.hlines(y=layout.sideline, xmin=-90, xmax=90, color="red", linewidth=1)
+        gpd.GeoSeries(layout.data_rect).plot(ax=ax, facecolor="none", edgecolor="g")
+        gpd.GeoSeries(layout.visible_map_rect).plot(
+            ax=ax, facecolor="none", edgecolor="m"
+        )
+
+    return tree_lines, connectors
+
+
+def draw_basemap(ax, layout, pending, attribution_position, font_size):
+    """Puts the tiles of a :class:`~lingtreemaps.tiles.PendingBasemap` under
+    the map, with an attribution."""
+    visible_map = layout.visible_map
+
+    def get_attribution_position(position):
+        if position == "bottomleft":
+            return (
+                visible_map[0] + (visible_map[2] - visible_map[0]) * 0.005,
+                visible_map[1] + (visible_map[3] - visible_map[1]) * 0.005,
+                "left",
+                "bottom",
+            )
+        if position == "bottomright":
+            return (
+                visible_map[2] - (visible_map[2] - visible_map[0]) * 0.005,
+                visible_map[1] + (visible_map[3] - visible_map[1]) * 0.005,
+                "right",
+                "bottom",
+            )
+        if position == "topleft":
+            return (
+                visible_map[0] + (visible_map[2] - visible_map[0]) * 0.005,
+                visible_map[3] - (visible_map[3] - visible_map[1]) * 0.005,
+                "left",
+                "top",
+            )
+        if position == "topright":
+            return (
+                visible_map[2] - (visible_map[2] - visible_map[0]) * 0.005,
+                visible_map[3] - (visible_map[3] - visible_map[1]) * 0.005,
+                "right",
+                "top",
+            )
+        log.error(
+            "Please specify a valid attrib position: bottomleft,\
+         bottomright, topleft, or topright."
+        )
+        sys.exit(1)
+
+    image, extent = pending.result()
+    ax.imshow(image, extent=extent, interpolation="bilinear", aspect=ax.get_aspect())
+    pos_x, pos_y, halign, valign = get_attribution_position(attribution_position)
+    # copied from
+    # https://github.com/geopandas/contextily/blob/72c85a1097dfad6f03d2b0b17cd92dfd8171b0ee/contextily/plotting.py#L249
+    # (needed to set custom xy values)
+
+    # Original work: Copyright (c) 2016, Dani Arribas-Bel
+    # Modified work: Copyright 2022 Florian Matter
+    # All rights reserved.
+
+    # Redistribution and use in source and binary forms, with or without
+    # modification, are permitted provided that the following conditions are met:
+
+    # * Redistributions of source code must retain the above copyright notice, this
+    #   list of conditions and the following disclaimer.
+
+    # * Redistributions in binary form must reproduce the above copyright
+    #   notice, this list of conditions and the following disclaimer in the
+    #   documentation and/or other materials provided with the distribution.
+
+    # * Neither the name of Dani Arribas-Bel nor the names of other contributors
+    #   may be used to endorse or promote products derived from this software
+    #   without specific prior written permission.
+
+    # THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND
+    # CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+    # INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF
+    # MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+    # DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR
+    # CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+    # SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+    # LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF
+    # USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+    # ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+    # LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+    # ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+    # POSSIBILITY OF SUCH DAMAGE.
+
+    ax.text(
+        x=pos_x,
+        y=pos_y,
+        s=providers.OpenStreetMap.Mapnik.attribution,
+        ha=halign,
+        va=valign,
+        transform=ax.transData,
+        size=font_size,
+        path_effects=[patheffects.withStroke(linewidth=2, foreground="w")],
+        wrap=True,
+    )
+
+
+def draw_feature(  # noqa: MC0001
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+    ax,
+    layout,
+    colors,
+    points,
+    id_col,
+    legend_position,
+    legend_size,
+    leaf_marker_size,
+    leaf_lw,
+    map_marker_size,
+    map_marker_lw,
+    nonterminal_nodes,
+):
+    """Draws the markers on the map, the leaves and the nodes (colored by
+    feature value) and the legend. ``points`` are the (rotated) located rows
+    of ``colors.languages``. Returns the added artists."""
+    existing = set(ax.get_children())
+    hatching = colors.hatching
+    marker_gdf = gpd.GeoDataFrame(
+        colors.markers,
+        geometry=gpd.points_from_xy(
+            colors.markers.Longitude, colors.markers.Latitude
+        ),
+    )
+
+    if hatching:
+        for value, hatch in colors.hatches.items():
+            marker_gdf[marker_gdf["Value"] == value].plot(
+                ax=ax,
+                markersize=map_marker_size,
+                facecolor=marker_gdf[marker_gdf["Value"] == value]["color"],
+                linewidth=map_marker_lw,
+                zorder=99,
+                hatch=hatch,
+                **HATCH_STYLE,
+            )
+        points[pd.isnull(points["Value"])].plot(
+            ax=ax,
+            markersize=map_marker_size,
+            facecolor=points[pd.isnull(points["Value"])]["color"],
+            linewidth=map_marker_lw,
+            edgecolor="black",
+            zorder=88,
+        )
+    else:
+        points.plot(
+            ax=ax,
+            markersize=map_marker_size,
+            facecolor=points["color"],
+            linewidth=map_marker_lw,
+            edgecolor="black",
+            zorder=99,
+        )
+
+    if colors.has_values and legend_position:
+        visible_map = layout.visible_map
+        bbox_coords = (
+            visible_map[0],
+            visible_map[1],
+            visible_map[2] - visible_map[0],
+            visible_map[3] - visible_map[1],
+        )
+        legend = ax.legend(
+            handles=colors.legend_handles(),
+            loc=legend_position,
+            bbox_to_anchor=bbox_coords,
+            bbox_transform=ax.transData,
+            prop={"size": legend_size, "family": "Linux Libertine"},
+        ).get_frame()
+
+        legend.set_edgecolor("black")
+        legend.set_facecolor("white")
+
+    if nonterminal_nodes:
+        internal = layout.internal
+        for i in layout.preorder:
+            if not internal[i] or i == layout.root:
+                continue
+            name = layout.node_names[i]
+            if name in colors.clade_colors:
+                circle = matplotlib.patches.Circle(
+                    (layout.node_x[i], layout.node_y[i]),
+                    leaf_marker_size,
+                    facecolor=colors.clade_colors[name],
+                    edgecolor="black",
+                    zorder=99,
+                    lw=leaf_lw,
+                )
+                ax.add_patch(circle)
+
+    node_leafs = layout.leaf_coords
+    for value in colors.hatches:
+        node_leafs["dummy_" + value] = DUMMY_COORDS
+    leaf_df = marker_gdf[marker_gdf[id_col].isin(node_leafs)]
+    leaf_df["geometry"] = [
+        shapely.geometry.Point(node_leafs[x]) for x in leaf_df[id_col]
+    ]
+
+    if hatching:
+        for value, hatch in colors.hatches.items():
+            leaf_df[leaf_df["Value"] == value].plot(
+                ax=ax,
+                markersize=leaf_marker_size,
+                facecolor=leaf_df[leaf_df["Value"] == value]["color"],
+                linewidth=leaf_lw,
+                zorder=99,
+                hatch=hatch,
+                **HATCH_STYLE,
+            )
+        leaf_df[pd.isnull(leaf_df["Value"])].plot(
+            ax=ax,
+            markersize=leaf_marker_size,
+            facecolor=leaf_df[pd.isnull(leaf_df["Value"])]["color"],
+            linewidth=leaf_lw,
+            edgecolor="black",
+            zorder=99,
+        )
+    else:
+        leaf_df.plot(
+            ax=ax,
+            markersize=leaf_marker_size,
+            facecolor=leaf_df["color"],
+            linewidth=leaf_lw,
+            edgecolor="black",
+            zorder=99,
+        )
+    return [x for x in ax.get_children() if x not in existing]
+
+
+def save_figure(fig, filename, file_format):
+    """Saves ``fig`` as ``{filename}.{file_format}``, returns the path"""
+    out_path = figure_path(filename, file_format)
+    log.info(f"Saving file {out_path}")
+    if "tif" in out_path.rsplit(".", maxsplit=1)[-1]:
+        fig.savefig(out_path, bbox_inches="tight", pad_inches=0, dpi=2000)
+    else:
+        fig.savefig(out_path, bbox_inches="tight", pad_inches=0)
+    return out_path
+
+
+@white_hatches
+def plot_map(  # noqa: MC0001
+    # pylint: disable=too-many-arguments
+    # pylint: disable=too-many-locals
+    # everything for a green linting badge
+    lg_df,
+    tree,
+    feature_df,
+    text_df,
+    id_col,
+    label_column,
+    filename,
+    file_format,
+    tree_map_padding,
+    tree_sort_mode,
+    tree_depth,
+    tree_lw,
+    internal_map_padding_x,
+    internal_map_padding_y,
+    seaborn_palette,
+    color_dict,
+    hatch_dict,
+    legend_position,
+    leaf_marker_size,
+    leaf_lw,
+    map_marker_size,
+    map_marker_lw,
+    connection_lw,
+    external_map_padding,
+    font_size,
+    print_labels,
+    nonterminal_nodes,
+    color_tree,
+    hatching,
+    text_x_offset,
+    text_y_offset,
+    base_padding,
+    legend_size,
+    rotation,
+    ax,
+    # fig,
+    background,
+    attribution_position,
+    cx_provider,
+    debug,
+    tile_cache=None,
+    tile_cache_size=500,
+    offline=False,
+    tile_connections=2,
+    features=None,
+    profile=None,
+    colors=None,
+    layout=None,
+    **kwargs,
+):
+    def get_colors(feature_df):
+        return FeatureColors(
+            lg_df,
+            feature_df,
+            id_col=id_col,
+            seaborn_palette=seaborn_palette,
+            color_dict=color_dict,
+            hatch_dict=hatch_dict,
+            hatching=hatching,
+        )
+
+    profile = profile or NO_PROFILE
+
+    # with several features, the layout only depends on the language table;
+    # colors and layouts from earlier plots (see lingtreemaps.watch) are reused
+    with profile.stage("merge"):
+        if colors is None:
+            colors = get_colors(feature_df)
+        located = located_points(colors.languages)
+    with profile.stage("layout"):
+        if layout is None:
+            layout = compute_layout(
+                located,
+                tree,
+                id_col=id_col,
+                tree_sort_mode=tree_sort_mode,
+                tree_depth=tree_depth,
+                tree_map_padding=tree_map_padding,
+                internal_map_padding_x=internal_map_padding_x,
+                internal_map_padding_y=internal_map_padding_y,
+                external_map_padding=external_map_padding,
+                base_padding=base_padding,
+                rotation=rotation,
+                debug=debug,
+                profile=profile,
+            )
+
+    # the basemap tiles are downloaded while everything else is drawn
+    if background == "osm":
+        cx_provider = providers.OpenStreetMap.Mapnik
+    pending = None
+    if cx_provider:
+        pending = prefetch(
+            layout.outer_bounds,
+            cx_provider,
+            get_cache(tile_cache, tile_cache_size * 2**20, offline),
+            connections=tile_connections,
+        )
+
+    # start plotting
+    own_figure = not ax
+    if own_figure:
+        _, ax = new_figure()
+
+    tree_lw = tree_lw or matplotlib.rcParams["lines.linewidth"]
+    points = layout.rotate(located)
+
+    def get_edge_colors(colors):
+        edge_colors = colors.edge_colors(layout.node_names, layout.root, color_tree)
+        return [edge_colors[i] for i in layout.segment_owners]
+
+    with profile.stage("draw", ax):
+        tree_lines, connectors = draw_layout(
+            ax,
+            layout,
+            points,
+            get_edge_colors(colors),
+            points["color"].to_numpy()[layout.connector_rows],
+            text_df,
+            label_column=label_column,
+            print_labels=print_labels,
+            tree_lw=tree_lw,
+            connection_lw=connection_lw,
+            font_size=font_size,
+            text_x_offset=text_x_offset,
+            text_y_offset=text_y_offset,
+            background=background,
+            cx_provider=cx_provider,
+            debug=debug,
+            profile=profile,
+        )
+
+    if debug:
+        log.info(
+            f"""
+tree_map_padding = {layout.tree_map_padding}
+internal_map_padding_x = {internal_map_padding_x}
+internal_map_padding_y = {internal_map_padding_y}
+text_x_offset = {text_x_offset}
+text_y_offset = {text_y_offset}
+tree_depth = {layout.tree_depth}
+tree_lw = {tree_lw}
+base_padding = {layout.base_padding}
+leaf_marker_size = {leaf_marker_size}"""
+        )
+
+    def draw(colors, points):
+        return draw_feature(
+            ax,
+            layout,
+            colors,
+            points,
+            id_col=id_col,
+            legend_position=legend_position,
+            legend_size=legend_size,
+            leaf_marker_size=leaf_marker_size,
+            leaf_lw=leaf_lw,
+            map_marker_size=map_marker_size,
+            map_marker_lw=map_marker_lw,
+            nonterminal_nodes=nonterminal_nodes,
+        )
+
+    if features is None:
+        with profile.stage("features", ax):
+            draw(colors, points)
+        if pending:
+            with profile.stage("basemap", ax):
+                draw_basemap(ax, layout, pending, attribution_position, font_size)
+        if filename:
+            with profile.stage("save"):
+                save_figure(ax.figure, filename, file_format)
+        return ax
+
+    # only colors, hatches and the legend change from one feature to the next;
+    # connectors get the color of the last value of their language
+    if pending:
+        with profile.stage("basemap", ax):
+            draw_basemap(ax, layout, pending, attribution_position, font_size)
+    connector_ids = points[id_col].to_numpy()[layout.connector_rows]
+    paths = {}
+    for name, feature_df in features.items():
+        log.info(f"Plotting feature {name}")
+        with profile.stage(f"features:{name}", ax):
+            colors = get_colors(feature_df)
+            tree_lines.set_color(get_edge_colors(colors))
+            connectors.set_color(
+                [colors.clade_colors.get(x, (0, 0, 0, 0)) for x in connector_ids]
+            )
+            artists = draw(colors, layout.rotate(located_points(colors.languages)))
+        with profile.stage(f"save:{name}"):
+            paths[name] = save_figure(
+                ax.figure, figure_path(filename, file_format, name), file_format
+            )
+        for artist in artists:
+            artist.remove()
+    if own_figure:
+        close_figure(ax.figure)
+    return paths
@@ -0,0 +1,92 @@
+"""Timings, artist counts and memory use of the stages of a plot."""
+import contextlib
+import json
+import time
+import tracemalloc
+
+
+class Profile:
+    """Statistics of the named stages of ``plot`` (pass ``profile=Profile()``).
+
+    For every stage, ``stages`` lists its wall time (``seconds``), the number
+    of artists it added to the axes (``artists``) and, if ``memory`` is true,
+    the peak of memory allocated while it ran (``peak_memory``, in bytes, as
+    traced by :mod:`tracemalloc`, which slows plotting down). Stages within
+    stages are named ``outer/inner`` and included in the outer stage.
+    """
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = []
+        self._running = []
+
+    @contextlib.contextmanager
+    def stage(self, name, ax=None):
+        started_tracing = self.memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self._running:
+            name = f"{self._running[-1]['name']}/{name}"
+        running = {"name": name, "baseline": 0, "peak": 0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._running:
+                # the peak is reset for this stage, keep that of the outer one
+                self._running[-1]["peak"] = max(self._running[-1]["peak"], peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            # before Python 3.9, the peak is that since tracing started, which
+            # is exact for outermost stages and an upper bound for inner ones
+            running["baseline"] = running["peak"] = current
+        self._running.append(running)
+        artists = len(ax.get_children()) if ax is not None else 0
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = {
+                "name": name,
+                "seconds": time.perf_counter() - start,
+                "artists": len(ax.get_children()) - artists if ax is not None else 0,
+            }
+            self._running.pop()
+            if self.memory:
+                peak = max(running["peak"], tracemalloc.get_traced_memory()[1])
+                stats["peak_memory"] = peak - running["baseline"]
+            if started_tracing:
+                tracemalloc.stop()
+            self.stages.append(stats)
+
+    @property
+    def seconds(self):
+        """The time of all (outermost) stages"""
+        return sum(x["seconds"] for x in self.stages if "/" not in x["name"])
+
+    def to_dict(self):
+        return {"seconds": self.seconds, "stages": self.stages}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def __str__(self):
+        lines = [f"{'stage':<24}{'seconds':>10}{'artists':>9}{'peak MB':>9}"]
+        for x in self.stages:
+            memory = x.get("peak_memory")
+            memory = f"{memory / 2**20:.1f}" if memory is not None else "-"
+            lines.append(
+                f"{x['name']:<24}{x['seconds']:>10.4f}{x['artists']:>9}{memory:>9}"
+            )
+        return "\n".join(lines)
+
+
+class NoProfile:
+    """Used when no profile is wanted: its stages do nothing"""
+
+    context = contextlib.nullcontext()
+
+    def stage(self, name, ax=None):  # pylint: disable=unused-argument
+        return self.context
+
+
+NO_PROFILE = NoProfile()
@@ -0,0 +1,131 @@
+"""Rendered maps, cached by a digest of everything they depend on."""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import lingtreemaps
+from lingtreemaps.helpers import DiskCache
+from lingtreemaps.helpers import cache_dir
+from lingtreemaps.trees import ArrayTree
+
+
+log = logging.getLogger(__name__)
+
+# configuration values which do not change what a map looks like
+RUNTIME_KEYS = [
+    "ax",
+    "filename",
+    "offline",
+    "profile",
+    "render_cache",
+    "render_cache_size",
+    "tile_cache",
+    "tile_cache_size",
+    "tile_connections",
+]
+
+
+def default_cache_dir():
+    return cache_dir("renders")
+
+
+def table_digest(df):
+    """A digest of the column names, types and values of a table"""
+    if df is None:
+        return None
+    digest = hashlib.sha256()
+    columns = [[str(x) for x in df.columns], [str(x) for x in df.dtypes]]
+    digest.update(json.dumps(columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def tree_digest(tree):
+    """A digest of the topology, names, branch lengths and support values
+    of a ``Bio.Phylo`` tree or an :class:`~lingtreemaps.trees.ArrayTree`,
+    independent of how its nodes are numbered"""
+    if not isinstance(tree, ArrayTree):
+        tree = ArrayTree.from_phylo(tree)
+    order = tree.preorder()
+    position = np.empty(len(tree), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    parent = tree.parent[order]
+    parent = np.where(parent >= 0, position[parent], -1).astype(np.int64)
+    names = tree.node_names
+    digest = hashlib.sha256()
+    for array in [parent, tree.branch_length[order], tree.confidence[order]]:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update(json.dumps([names[x] for x in order.tolist()]).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render_key(lg_df, tree, feature_df, text_df, conf, path):
+    """The key of the map at ``path`` in the :class:`RenderCache`: a digest
+    of the tables, the tree, the configuration (without :data:`RUNTIME_KEYS`),
+    the file format and the version of lingtreemaps"""
+    conf = {k: v for k, v in conf.items() if k not in RUNTIME_KEYS}
+    conf["file_format"] = Path(path).suffix[1:]
+    inputs = [
+        lingtreemaps.__version__,
+        table_digest(lg_df),
+        tree_digest(tree),
+        table_digest(feature_df),
+        table_digest(text_df),
+        conf,
+    ]
+    text = json.dumps(inputs, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class RenderCache(DiskCache):
+    """Maps stored in ``directory`` by their :func:`render_key`, holding at
+    most ``max_size`` bytes; beyond that, the least recently used maps are
+    deleted."""
+
+    def __init__(self, directory=None, max_size=1000 * 2**20):
+        super().__init__(directory or default_cache_dir(), max_size)
+
+    def path(self, key, file_format):
+        return self.directory / key[:2] / f"{key[2:]}.{file_format}"
+
+    def fetch(self, key, target):
+        """Copies the map with ``key`` to ``target`` (of the same format);
+        returns whether it was cached"""
+        path = self.path(key, Path(target).suffix[1:])
+        try:
+            shutil.copyfile(path, target)
+        except FileNotFoundError:
+            return False
+        os.utime(path)  # mark as recently used
+        log.info(f"Copied {target} from the render cache")
+        return True
+
+    def put(self, key, source):
+        """Stores a copy of the map at ``source``"""
+        source = Path(source)
+        self.store(self.path(key, source.suffix[1:]), source.read_bytes())
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_render_cache(directory=None, max_size=1000 * 2**20):
+    """A shared :class:`RenderCache` for every directory. ``directory`` may
+    also be ``True`` for the default one or ``None``/``False`` for none."""
+    if not directory:
+        return None
+    if directory is True:
+        directory = None
+    directory = Path(directory or default_cache_dir()).resolve()
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = RenderCache(directory, max_size)
+        cache = _caches[directory]
+    cache.max_size = max_size
+    return cache
@@ -0,0 +1,371 @@
+"""A local HTTP service rendering maps in warm worker processes."""
+import hashlib
+import io
+import json
+import logging
+import os
+import shutil
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+import pandas as pd
+from xyzservices import providers
+import lingtreemaps
+from lingtreemaps.batch import warm_up
+from lingtreemaps.helpers import LRUCache
+from lingtreemaps.helpers import close_figure
+from lingtreemaps.helpers import remove_file
+from lingtreemaps.plotting import get_conf
+from lingtreemaps.renders import RUNTIME_KEYS
+from lingtreemaps.trees import read_newick
+
+
+log = logging.getLogger(__name__)
+
+# the formats maps can be requested in
+CONTENT_TYPES = {
+    "svg": "image/svg+xml",
+    "png": "image/png",
+    "pdf": "application/pdf",
+}
+
+# parsed trees of recent requests in a worker, by a digest of their newick
+tree_cache = LRUCache(maxsize=32)
+
+
+def parsed_tree(newick):
+    """The tree of a newick string, parsed only once per worker; every
+    request gets its own copy to sort"""
+    key = hashlib.sha256(newick.encode("utf-8")).hexdigest()
+    return tree_cache.get(key, lambda: read_newick(io.StringIO(newick))).copy()
+
+
+def read_table(value, **kwargs):
+    """A table sent as CSV text or as a list of records"""
+    if isinstance(value, str):
+        return pd.read_csv(io.StringIO(value), **kwargs)
+    return pd.DataFrame.from_records(value)
+
+
+def check_tile_provider(provider):
+    """Raises a ``ValueError`` unless ``provider`` is the name of an
+    xyzservices tile provider, so that requests cannot make the server fetch
+    arbitrary URLs"""
+    if not isinstance(provider, str):
+        raise ValueError("The cx_provider must be the name of a tile provider")
+    try:
+        providers.query_name(provider)
+    except ValueError:
+        raise ValueError(f"Unknown tile provider: {provider}") from None
+
+
+def check_payload(payload, tile_urls=False):
+    """Raises a ``ValueError`` if a request cannot be plotted; returns the
+    format of the map. Tile providers have to be given by name, unless
+    ``tile_urls`` is true."""
+    if not isinstance(payload, dict):
+        raise ValueError("The request must be a JSON object")
+    for key in ["languages", "tree"]:
+        if not payload.get(key):
+            raise ValueError(f"The request has no {key}")
+    if not isinstance(payload["tree"], str):
+        raise ValueError("The tree must be a newick string")
+    for key in ["languages", "feature", "text"]:
+        if payload.get(key) is not None and not isinstance(payload[key], (str, list)):
+            raise ValueError(f"The {key} must be CSV text or a list of records")
+    conf = payload.get("conf")
+    if conf is not None and not isinstance(conf, dict):
+        raise ValueError("The conf must be a JSON object")
+    if (conf or {}).get("cx_provider") and not tile_urls:
+        check_tile_provider(conf["cx_provider"])
+    file_format = payload.get("format") or get_conf(**(conf or {}))["file_format"]
+    if file_format not in CONTENT_TYPES:
+        raise ValueError(f"Maps can be rendered as {', '.join(CONTENT_TYPES)}")
+    return file_format
+
+
+def render_payload(payload, path, render_cache=None):
+    """Plots the map of a request (see :func:`check_payload`) to ``path``;
+    runs in a worker process"""
+    df = read_table(payload["languages"])
+    feature_df = read_table(payload["feature"]) if payload.get("feature") else None
+    text_df = (
+        read_table(payload["text"], keep_default_na=False)
+        if payload.get("text")
+        else None
+    )
+    # requests choose what maps look like, not where anything is stored
+    conf = {
+        k: v for k, v in (payload.get("conf") or {}).items() if k not in RUNTIME_KEYS
+    }
+    path = Path(path)
+    conf.update(filename=path.with_suffix("").as_posix(), file_format=path.suffix[1:])
+    if render_cache:
+        conf["render_cache"] = render_cache
+    tree = parsed_tree(payload["tree"])
+    ax = lingtreemaps.plot(df, tree, feature_df, text_df, **conf)
+    if ax is not None:  # not copied from the render cache
+        close_figure(ax.figure)
+
+
+class RenderServer:
+    """Renders the maps of requests in a pool of ``processes`` worker
+    processes (default: one per CPU), which load the background layers when
+    they start (unless ``preload`` is false) and keep parsed trees.
+
+    At most ``queue_size`` requests (default: as many as there are workers)
+    wait for a worker; further requests are rejected. A request waits at
+    most ``timeout`` seconds for its map. ``render_cache`` (a directory, or
+    ``True`` for the default one) is used for all maps. Requests may only
+    give tile URLs (``cx_provider``) instead of provider names if
+    ``tile_urls`` is true.
+    """
+
+    def __init__(
+        self,
+        processes=None,
+        queue_size=None,
+        timeout=60,
+        preload=True,
+        render_cache=None,
+        tile_urls=False,
+    ):  # pylint: disable=too-many-arguments
+        self.processes = processes or os.cpu_count() or 1
+        self.queue_size = self.processes if queue_size is None else queue_size
+        self.timeout = timeout
+        self.preload = preload
+        self.render_cache = render_cache
+        self.tile_urls = tile_urls
+        self.output_dir = Path(tempfile.mkdtemp(prefix="lingtreemaps-"))
+        self.started = time.monotonic()
+        self.metrics = dict.fromkeys(
+            ["requests", "rendered", "failed", "rejected", "timeouts"], 0
+        )
+        self.metrics["render_seconds"] = 0.0
+        self.in_flight = 0
+        self._pending = set()  # futures of maps which are not done yet
+        self._slots = threading.BoundedSemaphore(self.processes + self.queue_size)
+        self._lock = threading.Lock()
+        self._pool = self.new_pool()
+
+    def new_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            initializer=warm_up if self.preload else None,
+        )
+
+    def count(self, key, value=1):
+        with self._lock:
+            self.metrics[key] += value
+
+    def status(self):
+        """The health and the counters of the server"""
+        with self._lock:
+            return {
+                "status": "ok",
+                "uptime": time.monotonic() - self.started,
+                "workers": self.processes,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                **self.metrics,
+            }
+
+    def submit(self, payload, file_format):
+        """Starts rendering a map; returns the future and the path of the map
+        or ``None`` if all workers and queue places are taken"""
+        if not self._slots.acquire(blocking=False):  # pylint: disable=R1732
+            self.count("rejected")
+            return None
+        path = self.output_dir / f"{uuid.uuid4().hex}.{file_format}"
+        with self._lock:
+            self.in_flight += 1
+            pool = self._pool
+        try:
+            future = pool.submit(render_payload, payload, path, self.render_cache)
+        except BrokenProcessPool:
+            # a worker died; replace the pool for this and later requests
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = self.new_pool()
+                pool = self._pool
+            future = pool.submit(render_payload, payload, path, self.render_cache)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self.finished)
+        return future, path
+
+    def finished(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            self._pending.discard(future)
+        self._slots.release()
+
+    def render(self, payload, file_format):
+        """Renders a map and returns its path (to be deleted by the caller),
+        ``None`` if the server is busy. Raises a ``TimeoutError`` after
+        ``timeout`` seconds; the map is then deleted once it is done."""
+        submitted = self.submit(payload, file_format)
+        if submitted is None:
+            return None
+        future, path = submitted
+        start = time.monotonic()
+        try:
+            future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.count("timeouts")
+            if not future.cancel():
+                future.add_done_callback(lambda _: remove_file(path))
+            raise TimeoutError(f"No map after {self.timeout} seconds") from None
+        except Exception:
+            self.count("failed")
+            raise
+        self.count("rendered")
+        self.count("render_seconds", time.monotonic() - start)
+        return path
+
+    def close(self):
+        # shutdown(cancel_futures=True) needs Python 3.9
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._pool.shutdown(wait=False)
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    """``POST /plot`` renders a map, ``GET /health`` and ``GET /metrics``
+    report the state of the :class:`RenderServer`"""
+
+    server_version = f"lingtreemaps/{lingtreemaps.__version__}"
+    # the largest accepted request, in bytes
+    max_body_size = 100 * 2**20
+
+    def setup(self):
+        # reading requests and writing maps does not take longer than rendering
+        self.timeout = self.server.renderer.timeout
+        super().setup()
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple):
+            return super().address_string()
+        return "local"  # a unix socket
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        log.info(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {"error": message})
+
+    def do_GET(self):  # noqa: N802
+        renderer = self.server.renderer
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok", "version": lingtreemaps.__version__})
+        elif self.path == "/metrics":
+            self.send_json(200, renderer.status())
+        else:
+            self.send_error_json(404, f"Not found: {self.path}")
+
+    def read_payload(self):
+        """The JSON body of a request, ``None`` after sending an error"""
+        try:
+            size = int(self.headers.get("Content-Length", ""))
+        except ValueError:
+            self.send_error_json(411, "The request needs a Content-Length")
+            return None
+        if size > self.max_body_size:
+            self.send_error_json(413, f"Requests may have {self.max_body_size} bytes")
+            return None
+        try:
+            return json.loads(self.rfile.read(size))
+        except ValueError as e:
+            self.send_error_json(400, f"Invalid JSON: {e}")
+            return None
+
+    def do_POST(self):  # noqa: N802
+        if self.path != "/plot":
+            self.send_error_json(404, f"Not found: {self.path}")
+            return
+        renderer = self.server.renderer
+        renderer.count("requests")
+        payload = self.read_payload()
+        if payload is None:
+            return
+        try:
+            file_format = check_payload(payload, renderer.tile_urls)
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        try:
+            path = renderer.render(payload, file_format)
+        except TimeoutError as e:
+            self.send_error_json(504, str(e))
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            log.error(traceback.format_exc())
+            self.send_error_json(500, f"{type(e).__name__}: {e}")
+            return
+        if path is None:
+            self.send_error_json(503, "All workers are busy, try again later")
+            return
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPES[file_format])
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+        finally:
+            remove_file(path)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(renderer, host="127.0.0.1", port=8080, socket_path=None):
+    """An HTTP server for a :class:`RenderServer`, listening on ``host`` and
+    ``port`` or on the unix socket ``socket_path``"""
+    if socket_path:
+        socket_path = Path(socket_path)
+        if socket_path.exists() and stat.S_ISSOCK(socket_path.stat().st_mode):
+            socket_path.unlink()  # left by an earlier server
+        server = UnixHTTPServer(str(socket_path), RenderHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), RenderHandler)
+        server.daemon_threads = True
+    server.renderer = renderer
+    return server
+
+
+def serve(host="127.0.0.1", port=8080, socket_path=None, **kwargs):
+    """Serves maps until interrupted, see :class:`RenderServer` for ``kwargs``"""
+    renderer = RenderServer(**kwargs)
+    server = make_server(renderer, host, port, socket_path)
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    log.info(f"Serving maps on {where} with {renderer.processes} workers")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        renderer.close()
+        if socket_path:
+            remove_file(socket_path)
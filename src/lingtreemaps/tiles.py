@@ -0,0 +1,219 @@
+"""Basemap tiles (for ``cx_provider`` and ``background: osm``), cached on disk."""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from pathlib import Path
+import mercantile as mt
+import numpy as np
+import requests
+from PIL import Image
+from xyzservices import TileProvider
+from xyzservices import providers
+from lingtreemaps.helpers import DiskCache
+from lingtreemaps.helpers import cache_dir
+
+
+log = logging.getLogger(__name__)
+
+USER_AGENT = "lingtreemaps"
+MAX_LATITUDE = 85.0511  # the limit of the web mercator projection
+EARTH_RADIUS = 6378137.0
+
+
+def default_cache_dir():
+    return cache_dir("tiles")
+
+
+class TileCache(DiskCache):
+    """Map tiles stored in ``directory``, by URL.
+
+    The cache holds at most ``max_size`` bytes; beyond that, the least
+    recently used tiles are deleted. In ``offline`` mode, only cached tiles
+    are served and missing ones raise a ``FileNotFoundError``.
+    """
+
+    def __init__(self, directory=None, max_size=500 * 2**20, offline=False):
+        super().__init__(directory or default_cache_dir(), max_size)
+        self.offline = offline
+        self.session = requests.Session()
+        self.session.headers["user-agent"] = USER_AGENT
+
+    def path(self, url):
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / digest[2:]
+
+    def get(self, url):
+        """The content of the tile at ``url``, downloaded if it is not cached"""
+        path = self.path(url)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # mark as recently used
+            return data
+        except FileNotFoundError:
+            if self.offline:
+                raise FileNotFoundError(
+                    f"Tile {url} is not cached (offline mode)"
+                ) from None
+        log.debug(f"Downloading {url}")
+        response = self.session.get(url, timeout=20)
+        response.raise_for_status()
+        self.put(url, response.content)
+        return response.content
+
+    def put(self, url, data):
+        self.store(self.path(url), data)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(directory=None, max_size=500 * 2**20, offline=False):
+    """A shared :class:`TileCache` (and HTTP session) for every directory"""
+    directory = Path(directory or default_cache_dir()).resolve()
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = TileCache(directory, max_size, offline)
+        cache = _caches[directory]
+    cache.max_size = max_size
+    cache.offline = offline
+    return cache
+
+
+def get_provider(source):
+    """A ``TileProvider`` from a provider, its name or a tile URL"""
+    if isinstance(source, str):
+        if source.startswith("http"):
+            return TileProvider(url=source, attribution="", name="url")
+        return providers.query_name(source)
+    return source
+
+
+def get_zoom(bounds, provider):
+    """The zoom level contextily would choose for ``bounds`` (in lon/lat)"""
+    zoom = int(
+        min(
+            np.ceil(np.log2(360 * 2.0 / abs(bounds[2] - bounds[0]))),
+            np.ceil(np.log2(360 * 2.0 / abs(bounds[3] - bounds[1]))),
+        )
+    )
+    return max(min(zoom, provider.get("max_zoom", zoom)), provider.get("min_zoom", 0))
+
+
+def tile_set(bounds, source, zoom="auto"):
+    """The tiles covering ``bounds`` (xmin, ymin, xmax, ymax in lon/lat),
+    with their URLs"""
+    provider = get_provider(source)
+    west, east = bounds[0], bounds[2]
+    south = max(bounds[1], -MAX_LATITUDE)
+    north = min(bounds[3], MAX_LATITUDE)
+    if zoom == "auto":
+        zoom = get_zoom((west, south, east, north), provider)
+    tiles = list(mt.tiles(west, south, east, north, [zoom]))
+    return tiles, [provider.build_url(x=t.x, y=t.y, z=t.z) for t in tiles]
+
+
+def tile_array(data):
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert("RGBA"))
+
+
+def merge_tiles(tiles, arrays):
+    """Puts tile images together; returns the image and its extent (left,
+    right, bottom, top) in web mercator"""
+    xys = np.array([(t.x, t.y) for t in tiles])
+    indices = xys - xys.min(axis=0)
+    height, width, depth = arrays[0].shape
+    n_x, n_y = (indices + 1).max(axis=0)
+    image = np.zeros((height * n_y, width * n_x, depth), dtype=np.uint8)
+    for (x, y), array in zip(indices, arrays):
+        image[y * height : (y + 1) * height, x * width : (x + 1) * width] = array
+    bounds = np.array([mt.xy_bounds(t) for t in tiles])
+    extent = (
+        bounds[:, 0].min(),
+        bounds[:, 2].max(),
+        bounds[:, 1].min(),
+        bounds[:, 3].max(),
+    )
+    return image, extent
+
+
+def mercator_to_lonlat(x, y):
+    lon = np.degrees(np.asarray(x) / EARTH_RADIUS)
+    lat = np.degrees(2 * np.arctan(np.exp(np.asarray(y) / EARTH_RADIUS)) - np.pi / 2)
+    return lon, lat
+
+
+def warp_image(image, extent):
+    """Reprojects an image from web mercator to lon/lat.
+
+    Columns stay where they are; the rows are resampled (linearly) at evenly
+    spaced latitudes. Returns the image and its extent in lon/lat.
+    """
+    left, right, bottom, top = extent
+    (west, east), (south, north) = mercator_to_lonlat([left, right], [bottom, top])
+    height = image.shape[0]
+    # latitudes of the centers of the new rows, from top to bottom
+    step = (north - south) / height
+    lat = np.radians(north - step * (np.arange(height) + 0.5))
+    y = EARTH_RADIUS * np.log(np.tan(np.pi / 4 + lat / 2))
+    # positions in the source rows (pixel centers are at .5)
+    rows = np.clip((top - y) / (top - bottom) * height - 0.5, 0, height - 1)
+    above = np.floor(rows).astype(int)
+    below = np.minimum(above + 1, height - 1)
+    weight = (rows - above)[:, None, None]
+    warped = image[above] * (1 - weight) + image[below] * weight
+    return warped.round().astype(np.uint8), (west, east, south, north)
+
+
+class PendingBasemap:
+    """A basemap whose tiles are downloaded in the background, by at most
+    ``connections`` threads; :meth:`result` waits for them and puts the
+    image together."""
+
+    def __init__(self, bounds, source, cache=None, zoom="auto", connections=2):
+        cache = cache or get_cache()
+        self.tiles, urls = tile_set(bounds, source, zoom)
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, min(connections, len(urls))),
+            thread_name_prefix="lingtreemaps-tiles",
+        )
+        # tiles are decoded in the threads, too
+        self.futures = [
+            pool.submit(lambda url: tile_array(cache.get(url)), url) for url in urls
+        ]
+        pool.shutdown(wait=False)
+
+    def done(self):
+        return all(x.done() for x in self.futures)
+
+    def cancel(self):
+        """Stops downloading, waits for the running downloads to finish"""
+        for future in self.futures:
+            future.cancel()
+        wait(self.futures)
+
+    def result(self, timeout=None):
+        """The image and its extent (left, right, bottom, top), in lon/lat"""
+        try:
+            arrays = [x.result(timeout) for x in self.futures]
+        except BaseException:
+            self.cancel()
+            raise
+        return warp_image(*merge_tiles(self.tiles, arrays))
+
+
+def prefetch(bounds, source, cache=None, zoom="auto", connections=2):
+    """Starts downloading the tiles for a basemap of ``bounds``, returns a
+    :class:`PendingBasemap`"""
+    return PendingBasemap(bounds, source, cache, zoom, connections)
+
+
+def basemap(bounds, source, cache=None, zoom="auto"):
+    """A basemap image for ``bounds`` (xmin, ymin, xmax, ymax in lon/lat)
+    and its extent (left, right, bottom, top), in lon/lat"""
+    return prefetch(bounds, source, cache, zoom).result()
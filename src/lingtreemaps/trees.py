@@ -0,0 +1,340 @@
+"""A compact tree of integer arrays, read directly from newick files."""
+import copy
+import re
+from pathlib import Path
+import numpy as np
+
+
+# quoted labels (with '' for a quote), comments, punctuation and unquoted
+# labels, as in Bio.Phylo.NewickIO; unterminated quotes and comments only
+# match at the end of a chunk, to be completed by the next one
+NEWICK_TOKEN = re.compile(
+    r"'(?:[^']|'')*(?:'|\Z)|\[(?:\\.|[^\]])*(?:\]|\Z)|[(),:;]|[^\s()\[\]':;,]+"
+)
+QUOTED_LABEL = re.compile(r"'(?:[^']|'')*'")
+
+
+class ArrayTree:
+    """A tree stored in arrays indexed by node number.
+
+    Every node has a ``parent``, a ``first_child`` and a ``next_sibling``
+    (-1 if there is none), a ``branch_length`` and a ``confidence`` (``nan``
+    if missing) and a ``name``, which is a position in the table of unique
+    ``names`` (-1 for unnamed nodes). ``root`` is the number of the root,
+    ``comments`` holds the newick comments of nodes.
+
+    Use :func:`read_newick` or :meth:`from_phylo` to create trees and
+    :meth:`to_phylo` to get a ``Bio.Phylo`` tree.
+    """
+
+    def __init__(
+        self,
+        parent,
+        name,
+        names,
+        branch_length=None,
+        confidence=None,
+        root=0,
+        rooted=False,
+        comments=None,
+    ):
+        self.parent = np.asarray(parent, dtype=np.intp)
+        self.name = np.asarray(name, dtype=np.int32)
+        self.names = list(names)
+        size = len(self.parent)
+        self.branch_length = (
+            np.full(size, np.nan)
+            if branch_length is None
+            else np.asarray(branch_length, dtype=float)
+        )
+        self.confidence = (
+            np.full(size, np.nan)
+            if confidence is None
+            else np.asarray(confidence, dtype=float)
+        )
+        self.root = root
+        self.rooted = rooted
+        self.comments = comments or {}
+        # children are linked in the order of their numbers
+        self.first_child = np.full(size, -1, dtype=np.intp)
+        self.next_sibling = np.full(size, -1, dtype=np.intp)
+        order = np.argsort(self.parent, kind="stable")
+        order = order[self.parent[order] >= 0]
+        parents = self.parent[order]
+        siblings = parents[1:] == parents[:-1]
+        self.next_sibling[order[:-1][siblings]] = order[1:][siblings]
+        first = np.concatenate([[True], ~siblings])
+        self.first_child[parents[first]] = order[first]
+
+    def __len__(self):
+        return len(self.parent)
+
+    @property
+    def node_names(self):
+        """The names of all nodes (``None`` for unnamed ones)"""
+        names = self.names + [None]
+        return [names[i] for i in self.name.tolist()]
+
+    def node_name(self, node):
+        i = self.name[node]
+        return self.names[i] if i >= 0 else None
+
+    def is_leaf(self, node):
+        return self.first_child[node] < 0
+
+    def children(self, node):
+        children = []
+        child = self.first_child[node]
+        while child >= 0:
+            children.append(int(child))
+            child = self.next_sibling[child]
+        return children
+
+    def set_children(self, node, children):
+        """Reorders the children of ``node``"""
+        self.first_child[node] = children[0] if children else -1
+        for child, sibling in zip(children, children[1:] + [-1]):
+            self.next_sibling[child] = sibling
+
+    def copy(self):
+        """A copy whose children can be reordered (e.g. sorted) without
+        changing this tree; all other arrays are shared"""
+        tree = copy.copy(self)
+        tree.first_child = self.first_child.copy()
+        tree.next_sibling = self.next_sibling.copy()
+        return tree
+
+    def preorder(self):
+        """All nodes, parents before their children"""
+        first_child = self.first_child.tolist()
+        next_sibling = self.next_sibling.tolist()
+        order = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            children = []
+            child = first_child[node]
+            while child >= 0:
+                children.append(child)
+                child = next_sibling[child]
+            stack.extend(reversed(children))
+        return np.array(order, dtype=np.intp)
+
+    def postorder(self):
+        """All nodes, children before their parents"""
+        first_child = self.first_child.tolist()
+        next_sibling = self.next_sibling.tolist()
+        order = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            order.append(node)
+            child = first_child[node]
+            while child >= 0:
+                stack.append(child)
+                child = next_sibling[child]
+        return np.array(order[::-1], dtype=np.intp)
+
+    def leaves(self):
+        """The nodes without children, in tree order"""
+        order = self.preorder()
+        return order[self.first_child[order] < 0]
+
+    @classmethod
+    def from_clades(cls, clades, rooted=False):
+        """A tree of ``Bio.Phylo`` clades, listed in preorder"""
+        index = {clade: i for i, clade in enumerate(clades)}
+        parent = [-1] * len(clades)
+        name_ids = {}
+        name = []
+        for i, clade in enumerate(clades):
+            for child in clade.clades:
+                parent[index[child]] = i
+            if clade.name is None:
+                name.append(-1)
+            else:
+                name.append(name_ids.setdefault(clade.name, len(name_ids)))
+        return cls(
+            parent,
+            name,
+            list(name_ids),
+            branch_length=[
+                np.nan if x.branch_length is None else x.branch_length for x in clades
+            ],
+            confidence=[
+                np.nan if x.confidence is None else x.confidence for x in clades
+            ],
+            rooted=rooted,
+            comments={
+                i: clade.comment
+                for i, clade in enumerate(clades)
+                if getattr(clade, "comment", None)
+            },
+        )
+
+    @classmethod
+    def from_phylo(cls, tree):
+        """Converts a ``Bio.Phylo`` tree"""
+        return cls.from_clades(phylo_preorder(tree.root), tree.rooted)
+
+    def to_phylo(self):
+        """The tree as a ``Bio.Phylo.Newick.Tree``"""
+        from Bio.Phylo import Newick  # pylint: disable=import-outside-toplevel
+
+        clades = []
+        for i, name in enumerate(self.node_names):
+            clade = Newick.Clade(name=name)
+            if not np.isnan(self.branch_length[i]):
+                clade.branch_length = float(self.branch_length[i])
+            if not np.isnan(self.confidence[i]):
+                confidence = float(self.confidence[i])
+                clade.confidence = (
+                    int(confidence) if confidence.is_integer() else confidence
+                )
+            if i in self.comments:
+                clade.comment = self.comments[i]
+            clades.append(clade)
+        for node in self.preorder().tolist():
+            clades[node].clades = [clades[x] for x in self.children(node)]
+        return Newick.Tree(root=clades[self.root], rooted=self.rooted)
+
+
+def phylo_preorder(clade):
+    """The clades below (and including) a ``Bio.Phylo`` clade in preorder,
+    without recursion"""
+    clades = []
+    stack = [clade]
+    while stack:
+        clade = stack.pop()
+        clades.append(clade)
+        stack.extend(reversed(clade.clades))
+    return clades
+
+
+def newick_tokens(handle, chunk_size=2**16):
+    """The tokens of a newick file, as lists of the tokens in every chunk"""
+    buffer = ""
+    for chunk in iter(lambda: handle.read(chunk_size), ""):
+        text = buffer + chunk
+        tokens = NEWICK_TOKEN.findall(text)
+        # a token at the end of a chunk may continue in the next one, even a
+        # complete quoted label (with an escaped quote)
+        buffer = tokens.pop() if tokens and text.endswith(tokens[-1]) else ""
+        yield tokens
+    if (buffer[:1] == "'" and not QUOTED_LABEL.fullmatch(buffer)) or (
+        buffer[:1] == "[" and buffer[-1] != "]"
+    ):
+        raise ValueError(f"Unterminated newick label or comment: {buffer[:20]}")
+    yield [buffer] if buffer else []
+
+
+def parse_confidence(label):
+    """The support value in the label of an inner node, if any"""
+    try:
+        return float(label)
+    except ValueError:
+        return None
+
+
+def newick_tree(parent, labels, branch_length, comments, root, rooted):
+    """An :class:`ArrayTree` of the nodes collected by :func:`parse_newick`"""
+    parent = np.array(parent, dtype=np.intp)
+    internal = np.zeros(len(parent), dtype=bool)
+    internal[parent[parent >= 0]] = True
+    confidence = np.full(len(parent), np.nan)
+    name_ids = {}
+    name = []
+    for i, label in enumerate(labels):
+        if label and internal[i]:
+            # numbers labelling inner nodes are support values
+            support = parse_confidence(label)
+            if support is not None:
+                confidence[i] = support
+                label = None
+        if label is None:
+            name.append(-1)
+        else:
+            name.append(name_ids.setdefault(label, len(name_ids)))
+    return ArrayTree(
+        parent,
+        name,
+        list(name_ids),
+        branch_length=branch_length,
+        confidence=confidence,
+        root=root,
+        rooted=rooted,
+        comments=comments,
+    )
+
+
+def parse_newick(source, rooted=False):  # noqa: MC0001
+    """Yields the trees in a newick file (a path or an open text file) as
+    :class:`ArrayTree` objects, without building clade objects"""
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from parse_newick(f, rooted)
+        return
+    parent, labels, lengths, comments = [-1], [None], [np.nan], {}
+    root = current = depth = 0
+    branch = started = False
+    for tokens in newick_tokens(source):
+        for token in tokens:
+            started = True
+            if token == "(":
+                parent.append(current)
+                labels.append(None)
+                lengths.append(np.nan)
+                current = len(parent) - 1
+                depth += 1
+            elif token == ",":
+                if current == root:
+                    # no outer parentheses: the top-level clades get a new root
+                    parent.append(-1)
+                    labels.append(None)
+                    lengths.append(np.nan)
+                    root = parent[current] = len(parent) - 1
+                parent.append(parent[current])
+                labels.append(None)
+                lengths.append(np.nan)
+                current = len(parent) - 1
+            elif token == ")":
+                current = parent[current]
+                depth -= 1
+                if current < 0:
+                    raise ValueError("Parenthesis mismatch.")
+            elif token == ":":
+                branch = True
+            elif token == ";":
+                if depth != 0:
+                    raise ValueError("Parenthesis mismatch.")
+                yield newick_tree(parent, labels, lengths, comments, root, rooted)
+                parent, labels, lengths, comments = [-1], [None], [np.nan], {}
+                root = current = 0
+                started = False
+            elif token[0] == "[":
+                comments[current] = token[1:-1]
+            elif token[0] == "'":
+                labels[current] = token[1:-1].replace("''", "'")
+            elif branch:
+                lengths[current] = float(token)
+                branch = False
+            else:
+                labels[current] = token
+    if started:
+        # the last tree may lack a semicolon
+        if depth != 0:
+            raise ValueError("Parenthesis mismatch.")
+        yield newick_tree(parent, labels, lengths, comments, root, rooted)
+
+
+def read_newick(source, rooted=False):
+    """The only tree in a newick file, see :func:`parse_newick`"""
+    trees = parse_newick(source, rooted)
+    try:
+        tree = next(trees)
+    except StopIteration:
+        raise ValueError(f"There are no trees in {source}") from None
+    if next(trees, None) is not None:
+        raise ValueError(f"There are several trees in {source}")
+    return tree
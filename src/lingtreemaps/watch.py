@@ -0,0 +1,232 @@
+"""Plotting maps again when their files change, only redoing the stages
+affected by a change."""
+import logging
+import time
+import traceback
+from pathlib import Path
+import lingtreemaps
+from lingtreemaps.colors import FeatureColors
+from lingtreemaps.helpers import close_figure
+from lingtreemaps.helpers import read_data_file
+from lingtreemaps.layout import compute_layout
+from lingtreemaps.layout import located_points
+from lingtreemaps.plotting import get_conf
+from lingtreemaps.plotting import plot_map
+from lingtreemaps.trees import read_newick
+
+
+log = logging.getLogger(__name__)
+
+# the configuration values the colors (arguments of FeatureColors) and the
+# layout (arguments of compute_layout) depend on; all others are only drawn
+COLOR_KEYS = ["id_col", "seaborn_palette", "color_dict", "hatch_dict", "hatching"]
+LAYOUT_KEYS = [
+    "id_col",
+    "tree_sort_mode",
+    "tree_depth",
+    "tree_map_padding",
+    "internal_map_padding_x",
+    "internal_map_padding_y",
+    "external_map_padding",
+    "base_padding",
+    "rotation",
+    "debug",
+]
+
+
+class Stage:
+    """The result of a stage of plotting, computed again when one of its
+    inputs (tables or trees, compared by identity) or configuration values
+    changes"""
+
+    def __init__(self, name):
+        self.name = name
+        self.inputs = None
+        self.values = None
+        self.result = None
+
+    def get(self, inputs, values, compute):
+        """The result for ``inputs`` and ``values``, and whether ``compute()``
+        had to be called for it"""
+        if (
+            self.inputs is None
+            or values != self.values
+            or any(x is not y for x, y in zip(inputs, self.inputs))
+        ):
+            self.result = compute()
+            self.inputs = list(inputs)
+            self.values = values
+            return self.result, True
+        return self.result, False
+
+
+def layout_rows(languages, id_col):
+    """The IDs and coordinates of the located rows of a merged language
+    table, which is all of it the layout depends on"""
+    rows = languages.dropna(subset=["Latitude", "Longitude"])
+    return rows[[id_col, "Latitude", "Longitude"]].to_records(index=False).tolist()
+
+
+class IncrementalPlot:
+    """Plots maps of the same data again and again, reusing the colors while
+    the tables and the configuration values they depend on
+    (:data:`COLOR_KEYS`) stay the same, and the layout (with the sorted tree)
+    while the tree, :data:`LAYOUT_KEYS` and the merged rows
+    (:func:`layout_rows`) do, so new feature values only recompute the colors.
+
+    Tables and trees are compared by identity (the merged rows by value), so
+    they must not be modified in place between plots. ``recomputed`` lists
+    the stages the last plot computed again.
+    """
+
+    def __init__(self):
+        self.colors = Stage("colors")
+        self.layout = Stage("layout")
+        self.recomputed = []
+
+    def plot(self, lg_df, tree, feature_df=None, text_df=None, features=None, **kwargs):
+        """Plots like :func:`lingtreemaps.plot` or, with ``features``, like
+        :func:`lingtreemaps.plot_features`"""
+        if isinstance(text_df, str):
+            text_df = read_data_file(text_df, keep_default_na=False)
+        conf = get_conf(**kwargs)
+        if features is not None:
+            feature_df = None  # one layout for all features
+        colors, new_colors = self.colors.get(
+            [lg_df, feature_df],
+            [conf[k] for k in COLOR_KEYS],
+            lambda: FeatureColors(
+                lg_df, feature_df, **{k: conf[k] for k in COLOR_KEYS}
+            ),
+        )
+        # the layout only depends on which rows the merged table has, not on
+        # their values or colors
+        layout, new_layout = self.layout.get(
+            [tree],
+            [conf[k] for k in LAYOUT_KEYS]
+            + [layout_rows(colors.languages, conf["id_col"])],
+            lambda: compute_layout(
+                located_points(colors.languages),
+                tree,
+                **{k: conf[k] for k in LAYOUT_KEYS},
+            ),
+        )
+        self.recomputed = [
+            stage.name
+            for stage, new in [(self.colors, new_colors), (self.layout, new_layout)]
+            if new
+        ]
+        return plot_map(
+            lg_df,
+            tree,
+            feature_df,
+            text_df,
+            features=features,
+            colors=colors,
+            layout=layout,
+            **conf,
+        )
+
+
+class WatchedFiles:
+    """The tables, the tree and the configuration of a map, read again from
+    files whose modification time or size changed"""
+
+    def __init__(self, languages, tree, features=(), conf=None):
+        self.languages = Path(languages)
+        self.tree_path = Path(tree)
+        self.feature_paths = [Path(x) for x in features]
+        self.conf_path = Path(conf) if conf else None
+        self.readers = {self.languages: read_data_file, self.tree_path: read_newick}
+        for path in self.feature_paths:
+            self.readers[path] = read_data_file
+        if self.conf_path:
+            self.readers[self.conf_path] = lingtreemaps.load_conf
+        self.data = {}
+        self.stamps = {}
+
+    @property
+    def lg_df(self):
+        return self.data[self.languages]
+
+    @property
+    def tree(self):
+        return self.data[self.tree_path]
+
+    @property
+    def features(self):
+        """The feature tables by file name"""
+        return {x.stem: self.data[x] for x in self.feature_paths}
+
+    @property
+    def conf(self):
+        return self.data[self.conf_path] if self.conf_path else {}
+
+    def update(self):
+        """Reads the files changed since the last call and returns their paths.
+
+        A file which cannot be read (any more) keeps its last contents and is
+        only read again after its next change.
+        """
+        changed = []
+        for path, read in self.readers.items():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                if path not in self.data:
+                    raise
+                continue  # e.g. while an editor replaces it
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            if self.stamps.get(path) != stamp:
+                self.stamps[path] = stamp
+                try:
+                    self.data[path] = read(path)
+                except Exception:  # pylint: disable=broad-except
+                    if path not in self.data:
+                        raise
+                    log.error(f"Could not read {path}:\n{traceback.format_exc()}")
+                    continue
+                changed.append(path)
+        return changed
+
+
+def plot_files(plotter, files, **kwargs):
+    """Plots the map of :class:`WatchedFiles` with an :class:`IncrementalPlot`,
+    with the configuration file overriding ``kwargs``"""
+    kwargs.update(files.conf)
+    features = files.features
+    if len(features) > 1:
+        plotter.plot(files.lg_df, files.tree, features=features, **kwargs)
+        return
+    feature_df = next(iter(features.values()), None)
+    ax = plotter.plot(files.lg_df, files.tree, feature_df, **kwargs)
+    if kwargs.get("ax") is None:
+        close_figure(ax.figure)
+
+
+def watch_files(languages, tree, features=(), conf=None, interval=0.5, **kwargs):
+    """Plots a map and plots it again whenever one of its files changes,
+    until interrupted. Only the colors and the layout affected by a change are
+    computed again (see :class:`IncrementalPlot`), and the background layers
+    stay loaded.
+
+    ``features`` are paths of feature tables, ``conf`` is the path of a YAML
+    configuration overriding ``kwargs``. Files are checked every ``interval``
+    seconds; errors are logged and plotting resumes with the next change.
+    """
+    files = WatchedFiles(languages, tree, features, conf)
+    plotter = IncrementalPlot()
+    changed = files.update()
+    log.info(f"Watching {', '.join(str(x) for x in files.readers)}")
+    while True:
+        if changed:
+            try:
+                plot_files(plotter, files, **kwargs)
+                recomputed = ", ".join(plotter.recomputed) or "nothing"
+                log.info(f"Plotted the map (recomputed: {recomputed})")
+            except Exception:  # pylint: disable=broad-except
+                log.error(traceback.format_exc())
+        time.sleep(interval)
+        changed = files.update()
+        for path in changed:
+            log.info(f"{path} changed")
@@ -1,7 +1,92 @@
+import io
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
 from pathlib import Path
 import pytest
+from PIL import Image
 
 
 @pytest.fixture
 def data():
     return Path(__file__).parent / "data"
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        self.server.requests.append(self.path)
+        image = Image.new("RGB", (256, 256), (170, 211, 223))
+        with io.BytesIO() as f:
+            image.save(f, format="PNG")
+            body = f.getvalue()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def tile_server():
+    """A local tile server, recording the requested paths"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TileHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}/{{z}}/{{x}}/{{y}}.png"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class GlottologHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # noqa: N802
+        self.server.requests.append(self.path)
+        if self.server.error:
+            self.server.statuses.append(self.server.error)
+            self.send_error(self.server.error)
+            return
+        path = self.server.directory / self.path.split("/")[-1]
+        if not path.is_file():
+            self.send_error(404)
+            return
+        body = path.read_bytes()
+        etag = f'"{len(body)}-{path.stat().st_mtime_ns}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.server.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.server.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+@pytest.fixture
+def glottolog_server(data, tmp_path):
+    """A local stand-in for glottolog.org, serving (copies of) the trees in
+    data/glottolog and recording the requested paths and response statuses;
+    with an ``error`` status, every request fails with it"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GlottologHandler)
+    server.directory = tmp_path / "glottolog.org"
+    shutil.copytree(data / "glottolog", server.directory)
+    server.requests = []
+    server.statuses = []
+    server.error = None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_port}"
+    yield server
+    server.shutdown()
+    server.server_close()
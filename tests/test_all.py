@@ -1,11 +1,23 @@
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+import geopandas as gpd
+import matplotlib
+import matplotlib.pyplot as plt
 import pandas as pd
+import pytest
 from Bio import Phylo
 from click.testing import CliRunner
+from matplotlib.collections import LineCollection
 from lingtreemaps import download_glottolog_tree
 from lingtreemaps import plot
+from lingtreemaps import colors
+from lingtreemaps import plot_features
 from lingtreemaps.cli import download_tree, get_language_data
 from lingtreemaps.cli import plot as cli_plot
+from lingtreemaps.connectors import LeafConnectors
+from lingtreemaps.helpers import rotate_coords
+from lingtreemaps.helpers import rotate_geometries
+from lingtreemaps.plotting import figure_path
 
 
 def test_cli_download(data, tmp_path, monkeypatch):
@@ -99,3 +111,143 @@ def test_plot2(data, tmp_path, monkeypatch):
         debug=True,
     )
     assert (tmp_path / "test.svg").is_file()
+
+
+def test_plot_features(data, tmp_path):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    features = get_features(df)
+    other = features.assign(Value=features["Value"].map({"A": "B", "B": "C", "C": "A"}))
+    paths = plot_features(
+        df,
+        tree,
+        {"one": features, "two": other},
+        filename=tmp_path / "cariban",
+        file_format="svg",
+        background="countries",
+    )
+    assert list(paths) == ["one", "two"]
+    for name in ["one", "two"]:
+        assert (tmp_path / f"cariban_{name}.svg").is_file()
+
+
+def test_cli_plot_features(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.read_csv(data / "cariban.csv")
+    get_features(df).to_csv("a.csv", index=False)
+    get_features(df.iloc[::-1]).to_csv("b.csv", index=False)
+    runner = CliRunner()
+    runner.invoke(
+        cli_plot,
+        args=[
+            (data / "cariban.csv").as_posix(),
+            (data / "cariban.newick").as_posix(),
+            "-f",
+            "a.csv",
+            "-f",
+            "b.csv",
+            "--output",
+            "map.png",
+        ],
+        catch_exceptions=False,
+    )
+    assert (tmp_path / "map_a.png").is_file()
+    assert (tmp_path / "map_b.png").is_file()
+
+
+def test_plot_tree_collections(data):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    ax = plot(
+        df, tree, get_features(df), color_tree=True, background="countries"
+    )
+    tree_lines = [
+        x
+        for x in ax.collections
+        if isinstance(x, LineCollection) and not isinstance(x, LeafConnectors)
+    ]
+    assert len(tree_lines) == 1
+    n_clades = len(list(tree.find_clades()))
+    n_leaves = len(tree.get_terminals())
+    assert len(tree_lines[0].get_segments()) == 2 * n_clades - 1 - n_leaves
+
+
+def test_plot_connectors(data):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    ax = plot(df, tree, background="countries", legend_position=None)
+    connectors = [x for x in ax.collections if isinstance(x, LeafConnectors)]
+    assert len(connectors) == 1
+    assert len(ax.texts) == len(tree.get_terminals())
+    ax = plot(df, tree, background="countries", print_labels=False)
+    assert not ax.texts
+
+
+def test_plot_shared_leaf(data):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    extra = df.iloc[[0]].assign(Latitude=df["Latitude"].iloc[0] + 1)
+    df = pd.concat([df, extra], ignore_index=True)
+    ax = plot(df, tree, background="countries")
+    (connectors,) = [x for x in ax.collections if isinstance(x, LeafConnectors)]
+    assert len(connectors.get_segments()) == len(df)
+    assert len(ax.texts) == len(tree.get_terminals())
+
+
+def test_plot_without_pyplot(data):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    plt.close("all")
+    ax = plot(df, tree, background="rivers")
+    assert not plt.get_fignums()
+    assert ax.figure.get_facecolor() == plt.matplotlib.colors.to_rgba("lightgray")
+    # plotting on a given ax
+    fig, ax = plt.subplots()
+    assert plot(df, tree, background="rivers", ax=ax) is ax
+    plt.close(fig)
+
+
+def test_plot_threads(data, tmp_path):
+    df = pd.read_csv(data / "cariban.csv")
+
+    def render(i):
+        tree = Phylo.read(data / "cariban.newick", "newick")
+        plot(
+            df,
+            tree,
+            get_features(df.copy()),
+            background="countries",
+            filename=tmp_path / f"map{i}",
+            file_format="png",
+        )
+        return (tmp_path / f"map{i}.png").read_bytes()
+
+    expected = render("")
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(render, range(8))) == [expected] * 8
+
+
+def test_white_hatches(monkeypatch):
+    color = matplotlib.rcParams["hatch.color"]
+    # matplotlib before 3.10, without per-artist hatch colors
+    monkeypatch.setattr(colors, "HATCH_STYLE", {})
+    get_color = colors.white_hatches(lambda: matplotlib.rcParams["hatch.color"])
+    assert get_color() == "white"
+    assert matplotlib.rcParams["hatch.color"] == color
+
+
+def test_rotate():
+    points = gpd.GeoSeries(gpd.points_from_xy([0, 1, -3], [2, 5, 1]))
+    expected = points.rotate(30, origin=(1, 1))
+    x, y = rotate_coords(points.x, points.y, 30, (1, 1))
+    assert x == pytest.approx(expected.x)
+    assert y == pytest.approx(expected.y)
+    rotated = gpd.GeoSeries(rotate_geometries(points.values, 30, (1, 1)))
+    assert rotated.geom_equals_exact(expected, 1e-9).all()
+
+
+def test_figure_path():
+    assert figure_path("map", "pdf") == "map.pdf"
+    assert figure_path("map.svg", "pdf") == "map.svg"
+    assert figure_path("v1.2/map", "png", "a") == "v1.2/map_a.png"
+    assert figure_path(None, "png", "a") == "a.png"
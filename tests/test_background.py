@@ -0,0 +1,66 @@
+import pytest
+from shapely.geometry import Point
+from lingtreemaps import background
+
+
+def test_layer_cache():
+    cache = background.LayerCache(maxsize=2)
+    for key in "abc":
+        cache.get(key, lambda key=key: key.upper())
+    assert "a" not in cache and len(cache) == 2
+    assert cache.get("b", lambda: "new") == "B"
+    cache.get("d", lambda: "D")
+    assert "b" in cache and "c" not in cache
+    cache.resize(1)
+    assert len(cache) == 1 and "d" in cache
+
+
+def test_load_layer(monkeypatch):
+    monkeypatch.setattr(background, "layer_cache", background.LayerCache())
+    countries = background.load_layer("countries")
+    assert background.load_layer("countries") is countries
+    assert background.load_layer("countries", 2) is not countries
+    # rivers are only read when requested
+    assert all(name == "countries" for name, level in background.layer_cache.keys())
+
+
+def test_visible_layer():
+    bounds = [-60, -5, -50, 5]
+    visible = background.visible_layer("countries", bounds, 0, 90, (-55, 0))
+    expected = background.clip_layer(background.load_layer("countries"), bounds)
+    expected = expected.rotate(90, origin=Point(-55, 0))
+    assert len(visible) == len(expected)
+    assert visible.total_bounds == pytest.approx(expected.total_bounds)
+
+
+def test_clip_layer():
+    countries = background.load_layer("countries")
+    bounds = [-60, -5, -50, 5]
+    clipped = background.clip_layer(countries, bounds, margin=0)
+    assert 0 < len(clipped) < len(countries)
+    xmin, ymin, xmax, ymax = clipped.total_bounds
+    assert xmin >= -60 and ymin >= -5 and xmax <= -50 and ymax <= 5
+
+
+def test_compact_layers(tmp_path):
+    paths = background.build_compact_layers(tmp_path, levels=[0, 0.1])
+    assert len(paths) == len(background.LAYER_FILES)
+    path = background.compact_path("rivers", 1, tmp_path)
+    rivers = background.read_compact_layer(path)
+    original = background.read_layer("rivers")
+    assert len(rivers) == len(original)
+    assert (
+        rivers.geometry.count_coordinates().sum()
+        < original.geometry.count_coordinates().sum()
+    )
+    assert background.choose_level([0, 0, 5, 5]) == 0
+    assert background.choose_level([-180, -90, 180, 90]) == len(background.LEVELS) - 1
+
+
+def test_build_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    paths = background.build_compact_layers(levels=[0, 0.5])
+    assert all(x.parent == tmp_path / "lingtreemaps" / "backgrounds" for x in paths)
+    # rebuilt layers are preferred to the shipped ones
+    rebuilt = background.read_compact_layer(paths[0])
+    assert background.read_layer("countries", 1).equals(rebuilt)
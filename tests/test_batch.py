@@ -0,0 +1,60 @@
+import yaml
+from click.testing import CliRunner
+from lingtreemaps import background
+from lingtreemaps.batch import load_manifest
+from lingtreemaps.batch import run_batch
+from lingtreemaps.batch import warm_up
+from lingtreemaps.cli import batch
+
+
+def write_manifest(data, tmp_path):
+    jobs = [
+        {
+            "languages": (data / "cariban.csv").as_posix(),
+            "tree": (data / "cariban.newick").as_posix(),
+            "conf": {"background": "countries", "file_format": "png"},
+            "output": "first",
+        },
+        {"languages": "missing.csv", "tree": "missing.nwk"},
+        {
+            "languages": (data / "cariban.csv").as_posix(),
+            "tree": (data / "cariban.newick").as_posix(),
+            "conf": (data / "cariban.yaml").as_posix(),
+        },
+    ]
+    path = tmp_path / "jobs.yaml"
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.dump(jobs, f)
+    return path
+
+
+def test_load_manifest(data, tmp_path):
+    jobs = load_manifest(write_manifest(data, tmp_path))
+    assert len(jobs) == 3
+    assert jobs[1]["languages"] == (tmp_path / "missing.csv").as_posix()
+    assert jobs[0]["conf"]["file_format"] == "png"
+
+
+def test_run_batch(data, tmp_path):
+    results = run_batch(
+        write_manifest(data, tmp_path), processes=2, output_dir=tmp_path
+    )
+    assert [x["error"] is None for x in results] == [True, False, True]
+    assert "missing.csv" in results[1]["error"]
+    assert (tmp_path / "first.png").is_file()
+    assert (tmp_path / "cariban.pdf").is_file()
+
+
+def test_warm_up():
+    background.layer_cache.clear()
+    warm_up(levels=[1])
+    assert ("countries", 1) in background.layer_cache
+    assert ("rivers", 1) in background.layer_cache
+
+
+def test_cli_batch(data, tmp_path):
+    runner = CliRunner()
+    manifest = write_manifest(data, tmp_path).as_posix()
+    result = runner.invoke(batch, args=[manifest, "-j", "1", "-o", str(tmp_path)])
+    assert result.exit_code == 1
+    assert (tmp_path / "first.png").is_file()
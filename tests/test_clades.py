@@ -0,0 +1,63 @@
+from io import StringIO
+import numpy as np
+import pytest
+from Bio import Phylo
+from lingtreemaps.clades import CladeIndex
+from lingtreemaps.clades import sort_tree
+
+
+def get_tree():
+    return Phylo.read(StringIO("((a,b)ab,(c,(d,e)de)cde,f)root;"), "newick")
+
+
+def test_clade_index():
+    tree = get_tree()
+    y = {"a": 3, "b": 1, "c": 5, "d": 0, "e": 4}
+    index = CladeIndex(tree, y, y)
+    cde = next(tree.find_clades("cde"))
+    assert index.y_min[index.index[cde]] == 0
+    assert index.y_max[index.index[cde]] == 5
+    assert index.leaf_span[index.index[cde]] == 5
+    assert index.leaf_count[index.index[tree.root]] == 6
+    # f has no map point
+    assert np.isnan(index.extreme(next(tree.find_clades("f")), "min"))
+    with pytest.raises(ValueError):
+        index.extreme(cde, "mean")
+
+
+def test_sort_tree():
+    tree = get_tree()
+    y = {"a": 3, "b": 1, "c": 5, "d": 0, "e": 4, "f": 2}
+    sort_tree(tree, CladeIndex(tree, y, y), "min")
+    assert [x.name for x in tree.get_terminals()] == ["d", "e", "c", "b", "a", "f"]
+    tree = get_tree()
+    sort_tree(tree, CladeIndex(tree, y, y), "max")
+    assert [x.name for x in tree.get_terminals()] == ["f", "b", "a", "d", "e", "c"]
+
+
+def test_depths_and_middles():
+    tree = Phylo.read(StringIO("((a:1,b:2)ab:1,(c:0,d:0)cd:0)root:0.5;"), "newick")
+    index = CladeIndex(tree, {}, {})
+    depths = index.depths()
+    for clade in tree.find_clades():
+        expected = clade.depths()
+        if not max(expected.values()):
+            expected = clade.depths(unit_branch_lengths=True)
+        assert depths[index.index[clade]] == max(expected.values())
+    positions = {leaf: i for i, leaf in enumerate(tree.get_terminals())}
+    middles = index.middles(positions)
+    assert middles[index.index[tree.root]] == 1.5
+    assert middles[index.index[next(tree.find_clades("cd"))]] == 2.5
+
+
+def test_segments():
+    tree = get_tree()
+    index = CladeIndex(tree, {}, {})
+    x = np.arange(len(index.clades), dtype=float)
+    segments, owners = index.segments(x, x)
+    # one line leading to every non-root clade, one spanning every inner clade
+    assert len(segments) == len(owners) == 9 + 4
+    root = index.index[tree.root]
+    first, last = index.index[tree.root.clades[0]], index.index[tree.root.clades[-1]]
+    assert segments[0].tolist() == [[root, first], [root, last]]
+    assert segments[1].tolist() == [[root, first], [first, first]]
@@ -0,0 +1,108 @@
+import pandas as pd
+import pytest
+import requests
+from click.testing import CliRunner
+from lingtreemaps import download_glottolog_tree
+from lingtreemaps import download_glottolog_trees
+from lingtreemaps.cli import download_tree
+from lingtreemaps.glottolog import GlottologCache
+from lingtreemaps.glottolog import glottolog_tree
+
+
+def leaf_names(tree):
+    return [x.name for x in tree.get_terminals()]
+
+
+def test_download_glottolog_tree(glottolog_server, tmp_path):
+    cache = GlottologCache(tmp_path / "cache", glottolog_server.url)
+    tree = download_glottolog_tree("cari1283", cache=cache)
+    assert tree.root.name == "cari1283"
+    assert leaf_names(tree) == [
+        "apal1257",
+        "waya1271",
+        "waya1272",
+        "kari1301",
+        "kari1302",
+    ]
+    df = pd.DataFrame({"ID": ["apal1257", "waya1269", "gali1262"]})
+    tree = download_glottolog_tree("cari1283", df, cache=cache)
+    assert leaf_names(tree) == ["apal1257", "waya1269", "gali1262"]
+    assert glottolog_server.requests == [
+        "/resource/languoid/id/cari1283.newick.txt"
+    ] * 2
+    with pytest.raises(ValueError):
+        download_glottolog_tree("../cari1283", cache=cache)
+
+
+def test_glottolog_tree(data):
+    newick = (data / "glottolog" / "cari1283.newick.txt").read_text()
+    # clades of languages become leaves, even without several dialects
+    tree = glottolog_tree(newick, languages=["apal1256", "waya1269", "gali1262"])
+    assert leaf_names(tree) == ["apal1256", "waya1269", "gali1262"]
+    assert tree.root.clades[1].name == "gali1262"
+    assert {x.branch_length for x in tree.find_clades()} == {1}
+    # nested languages and subtrees
+    tree = glottolog_tree(newick, "guia1250", ["guia1250", "waya1269"])
+    assert leaf_names(tree) == ["guia1250"]
+    tree = glottolog_tree(newick, "guia1250", ["waya1269"])
+    assert tree.root.name == "guia1250"
+    assert leaf_names(tree) == ["apal1257", "waya1269"]
+
+
+def test_revalidation(glottolog_server, tmp_path):
+    cache = GlottologCache(tmp_path / "cache", glottolog_server.url)
+    newick = cache.get("guia1250")
+    assert cache.get("guia1250") == newick
+    assert glottolog_server.statuses == [200, 304]
+
+    # a changed tree is downloaded again
+    served = glottolog_server.directory / "guia1250.newick.txt"
+    served.write_text(newick.replace("Wayana A", "Wayana C"), encoding="utf-8")
+    assert "Wayana C" in cache.get("guia1250")
+    assert glottolog_server.statuses == [200, 304, 200]
+
+
+def test_offline(glottolog_server, tmp_path):
+    cache = GlottologCache(tmp_path / "cache", glottolog_server.url, offline=True)
+    with pytest.raises(FileNotFoundError):
+        cache.get("guia1250")
+    assert not glottolog_server.requests
+    cache.offline = False
+    newick = cache.get("guia1250")
+    cache.offline = True
+    assert cache.get("guia1250") == newick
+    assert len(glottolog_server.requests) == 1
+
+    # cached trees are used if the server fails
+    cache.offline = False
+    glottolog_server.error = 503
+    assert cache.get("guia1250") == newick
+    with pytest.raises(requests.HTTPError):
+        cache.get("cari1283")
+    assert glottolog_server.statuses[-2:] == [503, 503]
+
+    # or is down
+    glottolog_server.shutdown()
+    glottolog_server.server_close()
+    cache = GlottologCache(tmp_path / "cache", glottolog_server.url)
+    assert cache.get("guia1250") == newick
+
+
+def test_download_glottolog_trees(glottolog_server, tmp_path):
+    cache = GlottologCache(tmp_path / "cache", glottolog_server.url)
+    trees = download_glottolog_trees(["cari1283", "guia1250"], cache=cache)
+    assert list(trees) == ["cari1283", "guia1250"]
+    assert leaf_names(trees["guia1250"]) == ["apal1257", "waya1271", "waya1272"]
+    assert len(glottolog_server.requests) == 2
+
+
+def test_cli_download_trees(glottolog_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LINGTREEMAPS_GLOTTOLOG_URL", glottolog_server.url)
+    runner = CliRunner()
+    args = ["cari1283", "guia1250", "--cache", "cache"]
+    runner.invoke(download_tree, args=args, catch_exceptions=False)
+    assert (tmp_path / "cari1283.nwk").is_file()
+    assert (tmp_path / "guia1250.nwk").is_file()
+    runner.invoke(download_tree, args=args + ["--offline"], catch_exceptions=False)
+    assert len(glottolog_server.requests) == 2
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+from lingtreemaps import get_glottolog_csv
+from lingtreemaps.cli import download_tree
+from lingtreemaps.cli import get_language_data
+from lingtreemaps.languoids import LanguoidIndex
+from lingtreemaps.languoids import nested_sets
+
+
+RECORDS = [
+    ("cari1283", None, "family", "Cariban", None, None),
+    ("guia1250", "cari1283", "family", "Guianan Carib", None, None),
+    ("apal1256", "guia1250", "family", "Apalai-Wayana", None, None),
+    ("apal1257", "apal1256", "language", "Aparai", 1.2, -54.4),
+    ("waya1269", "guia1250", "language", "Wayana", 2.8, -54.3),
+    ("waya1271", "waya1269", "dialect", "Wayana A", None, None),
+    ("gali1262", "cari1283", "language", "Karina", 5.6, -53.9),
+    ("nolo1234", "cari1283", "language", "Unlocated", None, None),
+    ("tupi1275", None, "family", "Tupian", None, None),
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LanguoidIndex(tmp_path / "languoids.sqlite")
+    index.build(RECORDS)
+    return index
+
+
+def test_nested_sets():
+    numbers = nested_sets(RECORDS)
+    lft, rgt = numbers["guia1250"]
+    inside = {code for code, (x, _) in numbers.items() if lft < x < rgt}
+    assert inside == {"apal1256", "apal1257", "waya1269", "waya1271"}
+    # deep trees do not hit the recursion limit
+    chain = [("a0000000", None)] + [
+        (f"a{i:07d}", f"a{i - 1:07d}") for i in range(1, 5000)
+    ]
+    assert nested_sets(chain)["a0000000"] == (0, 9999)
+
+
+def test_languoid_index(index):
+    assert index.languoid("waya1269")["parent"] == "guia1250"
+    assert index.languoid("xxxx1234") is None
+    df = index.descendants("guia1250")
+    assert list(df["glottocode"]) == ["apal1256", "apal1257", "waya1269", "waya1271"]
+    df = index.descendants("cari1283", level="language")
+    assert list(df["glottocode"]) == ["apal1257", "waya1269", "gali1262", "nolo1234"]
+    with pytest.raises(KeyError):
+        index.descendants("xxxx1234")
+
+
+def test_get_glottolog_csv(index):
+    df = get_glottolog_csv("cari1283", index.path)
+    assert list(df.columns) == ["ID", "Latitude", "Longitude", "Name"]
+    assert list(df["ID"]) == ["apal1257", "waya1269", "gali1262"]
+
+
+def test_cli_languoid_index(index, glottolog_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("LINGTREEMAPS_GLOTTOLOG_URL", glottolog_server.url)
+    runner = CliRunner()
+    runner.invoke(
+        get_language_data,
+        args=["guia1250", "--index", index.path.as_posix()],
+        catch_exceptions=False,
+    )
+    assert list(pd.read_csv(tmp_path / "guia1250.csv")["ID"]) == [
+        "apal1257",
+        "waya1269",
+    ]
+    runner.invoke(
+        download_tree,
+        args=["guia1250", "-g", "--index", index.path.as_posix(), "--cache", "c"],
+        catch_exceptions=False,
+    )
+    assert (tmp_path / "guia1250.nwk").read_text().count(",") == 1
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from Bio import Phylo
+from lingtreemaps.layout import Layout
+from lingtreemaps.layout import compute_layout
+from lingtreemaps.layout import located_points
+
+
+def get_layout(data, **kwargs):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    return df, tree, compute_layout(located_points(df), tree, **kwargs)
+
+
+def test_layout(data):
+    df, tree, layout = get_layout(data)
+    assert list(layout.leaves) == [x.name for x in tree.get_terminals()]
+    assert len(layout.node_x) == len(layout.node_y) == len(list(tree.find_clades()))
+    assert layout.node_names[layout.root] == tree.root.name
+    assert len(layout.connector_ends) == len(df)
+    # the tree is sorted from bottom to top
+    leaves = [layout.leaf_coords[x] for x in layout.leaves]
+    assert all(np.diff([y for x, y in leaves]) > 0)
+    # the tree is left of the map, within the picture
+    assert layout.outer_bounds[0] < layout.node_x.min()
+    assert layout.node_x.max() < layout.visible_map[0]
+
+
+def test_layout_rotation(data):
+    _, _, layout = get_layout(data)
+    _, _, rotated = get_layout(data, rotation=90)
+    assert np.array_equal(rotated.center, layout.center)
+    width = layout.bounds[2] - layout.bounds[0]
+    height = layout.bounds[3] - layout.bounds[1]
+    assert np.isclose(rotated.bounds[2] - rotated.bounds[0], height)
+    assert np.isclose(rotated.bounds[3] - rotated.bounds[1], width)
+
+
+def test_save_layout(data, tmp_path):
+    _, _, layout = get_layout(data, tree_depth=3)
+    layout.save(tmp_path / "layout.npz")
+    loaded = Layout.load(tmp_path / "layout.npz")
+    assert loaded == layout
+    assert loaded.tree_depth == 3
+    assert loaded.leaf_coords == layout.leaf_coords
+    _, _, other = get_layout(data, tree_sort_mode="max")
+    assert other != layout
@@ -0,0 +1,85 @@
+import json
+import tracemalloc
+import matplotlib.pyplot as plt
+import pandas as pd
+from Bio import Phylo
+from click.testing import CliRunner
+from lingtreemaps import plot
+from lingtreemaps.cli import plot as cli_plot
+from lingtreemaps.profiling import NO_PROFILE
+from lingtreemaps.profiling import Profile
+
+
+def test_profile_stages():
+    profile = Profile()
+    fig, ax = plt.subplots()
+    with profile.stage("outer", ax):
+        ax.plot([0, 1], [0, 1])
+        with profile.stage("inner", ax):
+            data = list(range(100000))
+            ax.plot([0, 1], [1, 0])
+        del data
+    plt.close(fig)
+    inner, outer = profile.stages
+    assert (inner["name"], outer["name"]) == ("outer/inner", "outer")
+    assert (inner["artists"], outer["artists"]) == (1, 2)
+    assert outer["peak_memory"] >= inner["peak_memory"] > 100000
+    assert outer["seconds"] >= inner["seconds"]
+    assert profile.seconds == outer["seconds"]
+    assert "outer/inner" in str(profile)
+    assert NO_PROFILE.stage("outer", ax) is NO_PROFILE.stage("inner")
+
+
+def test_profile_without_reset_peak(monkeypatch):
+    # Python < 3.9
+    monkeypatch.delattr(tracemalloc, "reset_peak")
+    profile = Profile()
+    with profile.stage("first"):
+        data = list(range(100000))
+    del data
+    with profile.stage("second"):
+        pass
+    first, second = profile.stages
+    assert first["peak_memory"] > 100000 > second["peak_memory"]
+
+
+def test_plot_profile(data):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = Phylo.read(data / "cariban.newick", "newick")
+    profile = Profile()
+    ax = plot(df, tree, profile=profile)
+    plt.close(ax.figure)
+    stages = {x["name"]: x for x in profile.stages}
+    assert list(stages) == [
+        "merge",
+        "layout/sort",
+        "layout",
+        "draw/background",
+        "draw",
+        "features",
+    ]
+    assert stages["draw"]["artists"] > stages["draw/background"]["artists"] > 0
+    assert stages["features"]["artists"] > 0
+    assert all(x["peak_memory"] > 0 for x in profile.stages)
+
+
+def test_cli_profile(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    runner.invoke(
+        cli_plot,
+        args=[
+            (data / "cariban.csv").as_posix(),
+            (data / "cariban.newick").as_posix(),
+            "--output",
+            "map.png",
+            "--profile",
+            "profile.json",
+        ],
+        catch_exceptions=False,
+    )
+    with open(tmp_path / "profile.json", "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    names = [x["name"] for x in profile["stages"]]
+    assert names[:2] == ["read", "merge"] and names[-2:] == ["features", "save"]
+    assert profile["seconds"] > 0
@@ -0,0 +1,121 @@
+import os
+import matplotlib.pyplot as plt
+import pandas as pd
+from Bio import Phylo
+from click.testing import CliRunner
+from lingtreemaps import plot
+from lingtreemaps import plot_features
+from lingtreemaps import plotting
+from lingtreemaps.batch import run_batch
+from lingtreemaps.cli import plot as cli_plot
+from lingtreemaps.plotting import get_conf
+from lingtreemaps.renders import RenderCache
+from lingtreemaps.renders import render_key
+from lingtreemaps.renders import table_digest
+from lingtreemaps.renders import tree_digest
+from lingtreemaps.trees import read_newick
+
+
+def read_data(data):
+    return (
+        pd.read_csv(data / "cariban.csv"),
+        Phylo.read(data / "cariban.newick", "newick"),
+    )
+
+
+def test_render_key(data):
+    df, tree = read_data(data)
+    assert table_digest(df) == table_digest(df.copy())
+    assert table_digest(df) != table_digest(df.iloc[::-1])
+    assert tree_digest(tree) == tree_digest(read_newick(data / "cariban.newick"))
+    conf = get_conf()
+    key = render_key(df, tree, None, None, conf, "map.pdf")
+    # outputs and caches do not matter, the style and the format do
+    other = get_conf(filename="other", render_cache=True, file_format="png")
+    assert key == render_key(df, tree, None, None, other, "other/map.pdf")
+    assert key != render_key(df, tree, None, None, conf, "map.png")
+    assert key != render_key(df, tree, None, None, get_conf(font_size=5), "map.pdf")
+    tree.root.clades[0].name = "renamed"
+    assert key != render_key(df, tree, None, None, conf, "map.pdf")
+
+
+def test_plot_render_cache(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    kwargs = dict(filename="map", file_format="png", render_cache="cache")
+    ax = plot(*read_data(data), **kwargs)
+    plt.close(ax.figure)
+    rendered = (tmp_path / "map.png").read_bytes()
+    (tmp_path / "map.png").unlink()
+    assert plot(*read_data(data), **kwargs) is None
+    assert (tmp_path / "map.png").read_bytes() == rendered
+    # a changed configuration is plotted again
+    ax = plot(*read_data(data), font_size=5, **kwargs)
+    plt.close(ax.figure)
+    assert len(RenderCache("cache").files()) == 2
+
+
+def test_plot_features_render_cache(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df, _ = read_data(data)
+    features = {
+        name: pd.DataFrame({"Clade": df["ID"], "Value": df.index % values})
+        for name, values in [("a", 2), ("b", 3)]
+    }
+    plotted = []
+    plot_map = plotting.plot_map
+
+    def record(*args, features, **kwargs):
+        plotted.extend(features)
+        return plot_map(*args, features=features, **kwargs)
+
+    monkeypatch.setattr(plotting, "plot_map", record)
+    kwargs = dict(filename="map.svg", render_cache="cache")
+    expected = {"a": "map_a.svg", "b": "map_b.svg"}
+    assert plot_features(*read_data(data), features, **kwargs) == expected
+    assert plot_features(*read_data(data), features, **kwargs) == expected
+    features["b"] = features["b"].iloc[::-1]
+    assert plot_features(*read_data(data), features, **kwargs) == expected
+    assert plotted == ["a", "b", "b"]
+
+
+def test_render_cache_eviction(tmp_path):
+    cache = RenderCache(tmp_path, max_size=250)
+    for i in range(4):
+        for path in cache.files():
+            # older than the next one
+            os.utime(path, (path.stat().st_mtime - 10,) * 2)
+        (tmp_path / "map.png").write_bytes(bytes(100))
+        cache.put(f"{i:064x}", tmp_path / "map.png")
+    assert cache.size() == 200
+    assert not cache.fetch(f"{0:064x}", tmp_path / "copy.png")
+    assert cache.fetch(f"{3:064x}", tmp_path / "copy.png")
+
+
+def test_cli_render_cache(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    runner = CliRunner()
+    args = [
+        (data / "cariban.csv").as_posix(),
+        (data / "cariban.newick").as_posix(),
+        "--output",
+        "map.png",
+        "--render-cache",
+        "cache",
+    ]
+    for _ in range(2):
+        runner.invoke(cli_plot, args=args, catch_exceptions=False)
+        assert (tmp_path / "map.png").is_file()
+    assert len(RenderCache("cache").files()) == 1
+    jobs = [
+        {
+            "languages": (data / "cariban.csv").as_posix(),
+            "tree": (data / "cariban.newick").as_posix(),
+            "conf": {"file_format": "png"},
+            "output": "map",
+        }
+    ]
+    (tmp_path / "map.png").unlink()
+    results = run_batch(jobs, processes=0, render_cache="cache")
+    assert results[0]["error"] is None
+    assert (tmp_path / "map.png").is_file()
+    assert len(RenderCache("cache").files()) == 1
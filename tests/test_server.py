@@ -0,0 +1,153 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+import pandas as pd
+import pytest
+from lingtreemaps.server import RenderServer
+from lingtreemaps.server import UnixHTTPServer
+from lingtreemaps.server import check_payload
+from lingtreemaps.server import make_server
+from lingtreemaps.server import parsed_tree
+
+
+@pytest.fixture
+def map_server():
+    """A render server with a single worker on a free port"""
+    renderer = RenderServer(processes=1, queue_size=0, preload=False)
+    server = make_server(renderer, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+    renderer.close()
+
+
+def request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    try:
+        with urllib.request.urlopen(url, data=data) as response:
+            return response.status, response.headers["Content-Type"], response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read()
+
+
+def get_payload(data, **kwargs):
+    return {
+        "languages": (data / "cariban.csv").read_text(encoding="utf-8"),
+        "tree": (data / "cariban.newick").read_text(encoding="utf-8"),
+        **kwargs,
+    }
+
+
+def test_check_payload(data):
+    payload = get_payload(data)
+    assert check_payload(payload) == "pdf"
+    assert check_payload(dict(payload, conf={"file_format": "svg"})) == "svg"
+    assert check_payload(dict(payload, format="png")) == "png"
+    for invalid in [
+        [],
+        {"tree": payload["tree"]},
+        dict(payload, tree=["a", "b"]),
+        dict(payload, conf=[]),
+        dict(payload, format="tif"),
+        dict(payload, conf={"cx_provider": "http://localhost/{z}/{x}/{y}.png"}),
+        dict(payload, conf={"cx_provider": "Nonexistent.Tiles"}),
+        dict(payload, conf={"cx_provider": {"url": "http://localhost/"}}),
+    ]:
+        with pytest.raises(ValueError):
+            check_payload(invalid)
+    # tile providers by name, or by URL if the server allows it
+    assert check_payload(dict(payload, conf={"cx_provider": "CartoDB.Positron"}))
+    url = {"cx_provider": "http://localhost/{z}/{x}/{y}.png"}
+    assert check_payload(dict(payload, conf=url), tile_urls=True)
+
+
+def test_parsed_tree(data):
+    newick = (data / "cariban.newick").read_text(encoding="utf-8")
+    tree = parsed_tree(newick)
+    tree.set_children(tree.root, tree.children(tree.root)[::-1])
+    other = parsed_tree(newick)
+    assert other is not tree
+    assert other.children(other.root) == tree.children(tree.root)[::-1]
+    assert other.parent is tree.parent
+
+
+def test_serve(data, map_server):
+    df = pd.read_csv(data / "cariban.csv")
+    feature = pd.DataFrame({"Clade": df["ID"], "Value": df.index % 3})
+    payload = get_payload(
+        data, feature=feature.to_dict("records"), conf={"font_size": 5}, format="png"
+    )
+    status, content_type, body = request(f"{map_server.url}/plot", payload)
+    assert status == 200 and content_type == "image/png"
+    assert body.startswith(b"\x89PNG")
+    status, _, body = request(f"{map_server.url}/plot", dict(payload, format="svg"))
+    assert status == 200 and b"<svg" in body
+    # the maps are streamed from temporary files, which are deleted afterwards
+    for _ in range(100):
+        if not list(map_server.renderer.output_dir.iterdir()):
+            break
+        time.sleep(0.01)
+    assert not list(map_server.renderer.output_dir.iterdir())
+
+    status, _, body = request(f"{map_server.url}/plot", {"tree": "(a,b);"})
+    assert status == 400 and "languages" in json.loads(body)["error"]
+    status, _, body = request(f"{map_server.url}/plot", dict(payload, tree="(a,b"))
+    assert status == 500 and "Parenthesis" in json.loads(body)["error"]
+    assert request(f"{map_server.url}/other")[0] == 404
+
+    # the only worker is busy
+    map_server.renderer._slots.acquire()  # pylint: disable=protected-access
+    assert request(f"{map_server.url}/plot", payload)[0] == 503
+    map_server.renderer._slots.release()  # pylint: disable=protected-access
+    map_server.renderer.timeout = 0.001
+    assert request(f"{map_server.url}/plot", payload)[0] == 504
+
+    status, content_type, body = request(f"{map_server.url}/health")
+    assert status == 200 and json.loads(body)["status"] == "ok"
+    metrics = json.loads(request(f"{map_server.url}/metrics")[2])
+    assert metrics["workers"] == 1
+    assert metrics["requests"] == 6
+    assert metrics["rendered"] == 2
+    assert metrics["failed"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["rejected"] == 1
+
+
+def test_unix_socket(tmp_path):
+    renderer = RenderServer(processes=1, preload=False)
+    path = tmp_path / "lingtreemaps.sock"
+    server = make_server(renderer, socket_path=path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(path))
+            client.sendall(b"GET /health HTTP/1.0\r\n\r\n")
+            response = b"".join(iter(lambda: client.recv(4096), b""))
+    finally:
+        server.shutdown()
+        server.server_close()
+        renderer.close()
+    assert response.startswith(b"HTTP/1.0 200")
+    assert b'"status": "ok"' in response
+    # a stale socket is replaced
+    renderer = RenderServer(processes=1)
+    server = make_server(renderer, socket_path=path)
+    assert isinstance(server, UnixHTTPServer)
+    server.server_close()
+    renderer.close()
+
+
+def test_close(data):
+    renderer = RenderServer(processes=1, queue_size=3, preload=False)
+    futures = [renderer.submit(get_payload(data), "png")[0] for _ in range(4)]
+    renderer.close()
+    # the last map still waited for the worker
+    assert futures[-1].cancelled()
+    assert not renderer.output_dir.exists()
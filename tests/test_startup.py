@@ -0,0 +1,56 @@
+import subprocess
+import sys
+import pytest
+import lingtreemaps
+
+
+# importing the command line interface must not take longer than this (in
+# seconds); it is about 0.07 on a laptop, importing matplotlib alone takes
+# longer than the budget
+IMPORT_BUDGET = 0.3
+HEAVY_MODULES = [
+    "Bio",
+    "contextily",
+    "geopandas",
+    "matplotlib",
+    "numpy",
+    "pandas",
+    "requests",
+    "seaborn",
+    "shapely",
+]
+
+
+def run_python(*args):
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, check=True
+    )
+
+
+def import_time(module):
+    """The time (in seconds) it takes a new interpreter to import ``module``"""
+    output = run_python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in output.splitlines():
+        if line.startswith("import time:") and line.split("|")[-1].strip() == module:
+            return int(line.split("|")[1]) / 1e6
+    raise ValueError(f"No import time for {module}")
+
+
+def test_cli_import_time():
+    assert min(import_time("lingtreemaps.cli") for _ in range(3)) < IMPORT_BUDGET
+
+
+def test_lazy_imports():
+    loaded = run_python(
+        "-c", "import sys, lingtreemaps.cli; print(*sys.modules)"
+    ).stdout.split()
+    assert not {x.split(".")[0] for x in loaded} & set(HEAVY_MODULES)
+
+
+def test_lazy_attributes():
+    from lingtreemaps import plotting  # pylint: disable=import-outside-toplevel
+
+    assert lingtreemaps.plot is plotting.plot
+    assert "download_glottolog_trees" in dir(lingtreemaps)
+    with pytest.raises(AttributeError):
+        lingtreemaps.draw_map  # pylint: disable=pointless-statement
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Bio import Phylo
+from lingtreemaps import plot
+from lingtreemaps.tiles import TileCache
+from lingtreemaps.tiles import basemap
+from lingtreemaps.tiles import get_cache
+from lingtreemaps.tiles import mercator_to_lonlat
+from lingtreemaps.tiles import prefetch
+from lingtreemaps.tiles import tile_set
+from lingtreemaps.tiles import warp_image
+
+
+BOUNDS = (-60, -10, -40, 10)
+
+
+def test_tile_set():
+    tiles, urls = tile_set(BOUNDS, "http://tiles/{z}/{x}/{y}.png")
+    assert len(tiles) == len(urls) == 16
+    assert {x.z for x in tiles} == {6}
+    tiles, urls = tile_set(BOUNDS, "http://tiles/{z}/{x}/{y}.png", zoom=2)
+    assert urls == ["http://tiles/2/1/1.png", "http://tiles/2/1/2.png"]
+
+
+def test_warp_image():
+    # every row holds its own (web mercator) y coordinate
+    extent = (0, 1e6, -4e6, 6e6)
+    y = np.linspace(6e6, -4e6, 1000, endpoint=False) - 5e3
+    image = np.repeat(((y + 4e6) / 1e7 * 255)[:, None, None], 4, axis=2)
+    warped, (west, east, south, north) = warp_image(image, extent)
+    assert warped.shape == image.shape
+    assert (west, south) == pytest.approx(mercator_to_lonlat(0, -4e6))
+    assert (east, north) == pytest.approx(mercator_to_lonlat(1e6, 6e6))
+    lat = np.linspace(north, south, 1000, endpoint=False) - (north - south) / 2000
+    expected = np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) * 6378137.0
+    assert np.abs(warped[:, 0, 0] - (expected + 4e6) / 1e7 * 255).max() <= 1
+
+
+def test_tile_cache(tile_server, tmp_path):
+    cache = TileCache(tmp_path)
+    image, extent = basemap(BOUNDS, tile_server.url, cache)
+    assert image.shape[2] == 4
+    assert extent[0] <= BOUNDS[0] and extent[1] >= BOUNDS[2]
+    assert len(tile_server.requests) == 16
+    basemap(BOUNDS, tile_server.url, TileCache(tmp_path))
+    assert len(tile_server.requests) == 16
+
+
+def test_prefetch(tile_server, tmp_path):
+    pending = prefetch(BOUNDS, tile_server.url, TileCache(tmp_path), connections=4)
+    image, extent = pending.result(timeout=20)
+    assert pending.done()
+    assert len(tile_server.requests) == 16
+    expected, expected_extent = basemap(BOUNDS, tile_server.url, TileCache(tmp_path))
+    assert np.array_equal(image, expected)
+    assert extent == expected_extent
+
+
+def test_tile_cache_eviction(tile_server, tmp_path):
+    cache = TileCache(tmp_path)
+    basemap(BOUNDS, tile_server.url, cache)
+    tile_size = cache.size() // 16
+    _, urls = tile_set(BOUNDS, tile_server.url)
+    cache.get(urls[0])  # recently used
+    cache.max_size = tile_size * 18
+    basemap(BOUNDS, tile_server.url, cache, zoom=4)
+    assert cache.size() <= cache.max_size
+    assert cache.path(urls[0]).is_file()
+    assert not cache.path(urls[1]).is_file()
+
+
+def test_offline(tile_server, tmp_path):
+    cache = TileCache(tmp_path, offline=True)
+    with pytest.raises(FileNotFoundError):
+        basemap(BOUNDS, tile_server.url, cache)
+    assert not tile_server.requests
+    cache.offline = False
+    basemap(BOUNDS, tile_server.url, cache)
+    cache.offline = True
+    basemap(BOUNDS, tile_server.url, cache)
+    assert len(tile_server.requests) == 16
+
+
+def test_plot_tile_cache(data, tile_server, tmp_path):
+    df = pd.read_csv(data / "cariban.csv")
+    for offline in [False, True]:
+        tree = Phylo.read(data / "cariban.newick", "newick")
+        ax = plot(
+            df,
+            tree,
+            cx_provider=tile_server.url,
+            tile_cache=tmp_path,
+            offline=offline,
+        )
+        assert ax.images
+    assert len(tile_server.requests) == len(get_cache(tmp_path).files())
@@ -0,0 +1,109 @@
+from io import StringIO
+import numpy as np
+import pandas as pd
+import pytest
+from Bio import Phylo
+from lingtreemaps.layout import compute_layout
+from lingtreemaps.layout import located_points
+from lingtreemaps.trees import ArrayTree
+from lingtreemaps.trees import newick_tokens
+from lingtreemaps.trees import parse_newick
+from lingtreemaps.trees import phylo_preorder
+from lingtreemaps.trees import read_newick
+
+
+NEWICK = [
+    "((a,b)ab,(c,(d,e)de)cde,f)root;",
+    "((a:1,b:2)ab:1,(c:0,d:0e-1)cd:0)root:0.5;",
+    "('x y'[comment]:1,'it''s':2)90:3;",
+    "a,b,(c,d);",
+    " ( a , b ) c ",
+]
+
+
+def clades(tree):
+    return [
+        (x.name, x.branch_length, x.confidence, len(x.clades), x.comment)
+        for x in phylo_preorder(tree.root)
+    ]
+
+
+@pytest.mark.parametrize("newick", NEWICK)
+def test_read_newick(newick):
+    expected = clades(Phylo.read(StringIO(newick), "newick"))
+    assert clades(read_newick(StringIO(newick)).to_phylo()) == expected
+    tree = ArrayTree.from_phylo(Phylo.read(StringIO(newick), "newick"))
+    assert clades(tree.to_phylo()) == expected
+
+
+def test_read_newick_files(data):
+    for path in [data / "cariban.newick", *(data / "glottolog").glob("*.txt")]:
+        expected = clades(Phylo.read(path, "newick"))
+        assert clades(read_newick(path).to_phylo()) == expected
+        # tokens spanning chunks
+        text = path.read_text(encoding="utf-8")
+        tokens = [x for chunk in newick_tokens(StringIO(text)) for x in chunk]
+        for size in [1, 7, 100]:
+            chunks = newick_tokens(StringIO(text), chunk_size=size)
+            assert [x for chunk in chunks for x in chunk] == tokens
+
+
+def test_read_newick_chunks():
+    # escaped quotes and comments split between chunks
+    labels = [f"'it''s {i}'[&c=[{i}\\]]]" for i in range(300)]
+    newick = f"({','.join(labels)},'it''s':1,b);"
+    tree = read_newick(StringIO(newick))
+    assert clades(tree.to_phylo()) == clades(Phylo.read(StringIO(newick), "newick"))
+    assert tree.node_name(tree.leaves()[-2]) == "it's"
+    tokens = [x for chunk in newick_tokens(StringIO(newick)) for x in chunk]
+    for size in [*range(1, 11), 16, 64, 1000]:
+        chunks = newick_tokens(StringIO(newick), chunk_size=size)
+        assert [x for chunk in chunks for x in chunk] == tokens
+
+
+def test_array_tree():
+    tree = read_newick(StringIO(NEWICK[0]))
+    assert len(tree) == 10
+    assert tree.node_name(tree.root) == "root"
+    assert [tree.node_name(x) for x in tree.leaves()] == list("abcdef")
+    assert len(tree.names) == 10 and tree.name.dtype == np.int32
+    postorder = [tree.node_name(x) for x in tree.postorder()]
+    assert postorder == ["a", "b", "ab", "c", "d", "e", "de", "cde", "f", "root"]
+    root_children = tree.children(tree.root)
+    tree.set_children(tree.root, root_children[::-1])
+    assert [tree.node_name(x) for x in tree.leaves()] == list("fcdeab")
+    assert list(parse_newick(StringIO(NEWICK[0] * 2)))[1].node_names[0] == "root"
+    with pytest.raises(ValueError):
+        read_newick(StringIO("((a,b);"))
+    with pytest.raises(ValueError):
+        read_newick(StringIO(NEWICK[0] * 2))
+    with pytest.raises(ValueError):
+        read_newick(StringIO("('a,b);"))
+
+
+def test_layout_array_tree(data):
+    df = pd.read_csv(data / "cariban.csv")
+    layout = compute_layout(
+        located_points(df), Phylo.read(data / "cariban.newick", "newick")
+    )
+    tree = read_newick(data / "cariban.newick")
+    assert compute_layout(located_points(df), tree) == layout
+    # the array tree is sorted, too
+    assert [tree.node_name(x) for x in tree.leaves()] == list(layout.leaves)
+
+
+def test_deep_tree():
+    # too deep for the recursive traversals of Bio.Phylo
+    size = 3000
+    newick = "(" * (size - 1) + "l0," + ",".join(f"l{i})" for i in range(1, size))
+    tree = Phylo.read(StringIO(newick + ";"), "newick")
+    df = pd.DataFrame(
+        {
+            "ID": [f"l{i}" for i in range(size)],
+            "Latitude": np.linspace(-10, 10, size),
+            "Longitude": np.linspace(0, 20, size),
+        }
+    )
+    layout = compute_layout(located_points(df), tree)
+    assert len(layout.leaves) == size
+    assert len(read_newick(StringIO(newick)).to_phylo().root.clades) == 2
@@ -0,0 +1,118 @@
+import os
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+import yaml
+from click.testing import CliRunner
+from lingtreemaps import background
+from lingtreemaps import plot
+from lingtreemaps import watch
+from lingtreemaps.cli import plot as cli_plot
+from lingtreemaps.trees import read_newick
+from lingtreemaps.watch import IncrementalPlot
+from lingtreemaps.watch import WatchedFiles
+
+
+def get_feature(df):
+    return pd.DataFrame({"Clade": df["ID"], "Value": df.index % 3})
+
+
+def test_incremental_plot(data, tmp_path):
+    df = pd.read_csv(data / "cariban.csv")
+    tree = read_newick(data / "cariban.newick")
+    feature_df = get_feature(df)
+    # new values for the same languages, and a second value for a language
+    new_values = feature_df.assign(Value=feature_df["Value"] + 1)
+    more_values = pd.concat(
+        [new_values, new_values.iloc[:1].assign(Value=0)], ignore_index=True
+    )
+    plotter = IncrementalPlot()
+    kwargs = dict(filename=(tmp_path / "map").as_posix(), file_format="png")
+    changes = [
+        ({}, feature_df, ["colors", "layout"]),
+        ({"text_x_offset": 0.5, "font_size": 5}, feature_df, []),
+        ({"seaborn_palette": "muted"}, feature_df, ["colors"]),
+        ({"rotation": 10}, feature_df, ["layout"]),
+        ({}, new_values, ["colors"]),
+        ({}, more_values, ["colors", "layout"]),
+    ]
+    for change, feature_df, recomputed in changes:
+        kwargs.update(change)
+        plt.close(plotter.plot(df, tree, feature_df, **kwargs).figure)
+        assert plotter.recomputed == recomputed
+        # the same map as plotted from scratch
+        expected = dict(kwargs, filename=(tmp_path / "expected").as_posix())
+        ax = plot(df, read_newick(data / "cariban.newick"), feature_df, **expected)
+        plt.close(ax.figure)
+        assert (tmp_path / "map.png").read_bytes() == (
+            tmp_path / "expected.png"
+        ).read_bytes()
+
+
+def test_visible_layer_cache():
+    bounds = [-60, -5, -50, 5]
+    layer = background.visible_layer("countries", bounds, 2, 10, (-55, 0))
+    assert background.visible_layer("countries", bounds, 2, 10, (-55, 0)) is layer
+    assert background.visible_layer("countries", bounds, 2, 0, (-55, 0)) is not layer
+
+
+def touch(path, content):
+    path.write_text(content, encoding="utf-8")
+    # a new modification time, even on file systems with coarse timestamps
+    mtime = path.stat().st_mtime_ns + 10**9
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_watched_files(data, tmp_path):
+    conf = tmp_path / "conf.yaml"
+    touch(conf, "font_size: 5\n")
+    files = WatchedFiles(data / "cariban.csv", data / "cariban.newick", conf=conf)
+    assert len(files.update()) == 3
+    assert files.conf == {"font_size": 5} and len(files.lg_df) > 0
+    tree = files.tree
+    assert files.update() == []
+    touch(conf, "font_size: 6\n")
+    assert files.update() == [conf]
+    assert files.conf == {"font_size": 6} and files.tree is tree
+    # broken files keep their last contents
+    touch(conf, "font_size: [\n")
+    assert files.update() == []
+    assert files.conf == {"font_size": 6}
+    with pytest.raises(FileNotFoundError):
+        WatchedFiles(tmp_path / "missing.csv", data / "cariban.newick").update()
+
+
+def test_cli_watch(data, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conf = tmp_path / "conf.yaml"
+    touch(conf, yaml.dump({"file_format": "png"}))
+    rounds = []
+
+    def sleep(interval):
+        assert (tmp_path / "map.png").is_file()
+        (tmp_path / "map.png").unlink()
+        rounds.append(interval)
+        if len(rounds) == 1:
+            touch(conf, yaml.dump({"file_format": "png", "text_x_offset": 0.5}))
+        elif len(rounds) == 2:
+            touch(conf, "file_format: [\n")  # not plotted
+            (tmp_path / "map.png").touch()
+        else:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(watch.time, "sleep", sleep)
+    result = CliRunner().invoke(
+        cli_plot,
+        args=[
+            (data / "cariban.csv").as_posix(),
+            (data / "cariban.newick").as_posix(),
+            "--conf",
+            conf.as_posix(),
+            "--output",
+            "map",
+            "--watch",
+        ],
+        catch_exceptions=False,
+    )
+    assert result.exit_code == 0
+    assert len(rounds) == 3